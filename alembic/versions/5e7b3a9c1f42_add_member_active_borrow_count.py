@@ -0,0 +1,33 @@
+"""add member active borrow count
+
+Revision ID: 5e7b3a9c1f42
+Revises: d52f0c8e9b17
+Create Date: 2026-10-18 16:21:53.617402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7b3a9c1f42'
+down_revision: Union[str, Sequence[str], None] = 'd52f0c8e9b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('members', sa.Column('active_borrow_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.execute(
+        "UPDATE members SET active_borrow_count = ("
+        "SELECT count(*) FROM borrow_records "
+        "WHERE borrow_records.member_id = members.id AND borrow_records.returned_at IS NULL)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('members', 'active_borrow_count')
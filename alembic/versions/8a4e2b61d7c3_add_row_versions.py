@@ -0,0 +1,32 @@
+"""add row versions
+
+Revision ID: 8a4e2b61d7c3
+Revises: 3c1d7e9a2f10
+Create Date: 2026-10-18 13:48:05.214937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e2b61d7c3'
+down_revision: Union[str, Sequence[str], None] = '3c1d7e9a2f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('members', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('borrow_records', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('borrow_records', 'version')
+    op.drop_column('members', 'version')
+    op.drop_column('books', 'version')
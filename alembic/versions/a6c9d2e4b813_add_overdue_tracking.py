@@ -0,0 +1,47 @@
+"""add overdue tracking
+
+Revision ID: a6c9d2e4b813
+Revises: 5e7b3a9c1f42
+Create Date: 2026-10-18 17:05:12.448190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c9d2e4b813'
+down_revision: Union[str, Sequence[str], None] = '5e7b3a9c1f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'overdue_summaries',
+        sa.Column('scope', sa.String(length=10), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('overdue_count', sa.Integer(), nullable=False),
+        sa.Column('oldest_due_date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('scope', 'entity_id'),
+    )
+    # borrow_records is live; build without holding a write lock on Postgres.
+    # CONCURRENTLY cannot run inside a transaction, hence the autocommit block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_borrow_records_overdue', 'borrow_records', ['due_date', 'id'],
+            postgresql_where=sa.text('returned_at IS NULL'),
+            sqlite_where=sa.text('returned_at IS NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_borrow_records_overdue', table_name='borrow_records', postgresql_concurrently=True)
+    op.drop_table('overdue_summaries')
@@ -0,0 +1,38 @@
+"""add row counts
+
+Revision ID: c7d4a8e2f391
+Revises: e3b8f5a1c720
+Create Date: 2026-10-18 22:15:08.413902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d4a8e2f391'
+down_revision: Union[str, Sequence[str], None] = 'e3b8f5a1c720'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'row_counts',
+        sa.Column('table_name', sa.String(), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('table_name'),
+    )
+    op.execute(
+        "INSERT INTO row_counts (table_name, row_count) "
+        "SELECT 'books', COUNT(*) FROM books "
+        "UNION ALL SELECT 'members', COUNT(*) FROM members"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('row_counts')
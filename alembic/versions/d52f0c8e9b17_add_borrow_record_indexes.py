@@ -0,0 +1,44 @@
+"""add borrow record indexes
+
+Revision ID: d52f0c8e9b17
+Revises: 8a4e2b61d7c3
+Create Date: 2026-10-18 15:02:37.904211
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd52f0c8e9b17'
+down_revision: Union[str, Sequence[str], None] = '8a4e2b61d7c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # borrow_records is live; build without holding a write lock on Postgres.
+    # CONCURRENTLY cannot run inside a transaction, hence the autocommit block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_borrow_records_member_borrowed', 'borrow_records', ['member_id', 'borrowed_at', 'id'], unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_borrow_records_member_active', 'borrow_records', ['member_id'], unique=False,
+            postgresql_where=sa.text('returned_at IS NULL'),
+            sqlite_where=sa.text('returned_at IS NULL'),
+            postgresql_concurrently=True,
+        )
+        op.create_index('ix_borrow_records_book_id', 'borrow_records', ['book_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_borrow_records_book_id', table_name='borrow_records', postgresql_concurrently=True)
+        op.drop_index('ix_borrow_records_member_active', table_name='borrow_records', postgresql_concurrently=True)
+        op.drop_index('ix_borrow_records_member_borrowed', table_name='borrow_records', postgresql_concurrently=True)
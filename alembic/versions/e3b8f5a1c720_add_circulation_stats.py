@@ -0,0 +1,57 @@
+"""add circulation stats
+
+Revision ID: e3b8f5a1c720
+Revises: a6c9d2e4b813
+Create Date: 2026-10-18 19:42:31.905617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b8f5a1c720'
+down_revision: Union[str, Sequence[str], None] = 'a6c9d2e4b813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'daily_circulation',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('borrows', sa.Integer(), nullable=False),
+        sa.Column('returns', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day'),
+    )
+    op.create_table(
+        'book_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('borrows', sa.Integer(), nullable=False),
+        sa.Column('returns', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id']),
+        sa.PrimaryKeyConstraint('day', 'book_id'),
+    )
+    op.create_table(
+        'member_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('member_id', sa.Integer(), nullable=False),
+        sa.Column('borrows', sa.Integer(), nullable=False),
+        sa.Column('returns', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['member_id'], ['members.id']),
+        sa.PrimaryKeyConstraint('day', 'member_id'),
+    )
+    op.create_index('ix_books_on_loan', 'books', [sa.text('(total_copies - available_copies)')])
+    # Backfill from the existing ledger with: python -m app.commands rebuild-stats
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_on_loan', table_name='books')
+    op.drop_table('member_daily_stats')
+    op.drop_table('book_daily_stats')
+    op.drop_table('daily_circulation')
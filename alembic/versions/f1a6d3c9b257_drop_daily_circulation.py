@@ -0,0 +1,39 @@
+"""drop daily circulation
+
+Revision ID: f1a6d3c9b257
+Revises: c7d4a8e2f391
+Create Date: 2026-10-18 23:04:51.226381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a6d3c9b257'
+down_revision: Union[str, Sequence[str], None] = 'c7d4a8e2f391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Daily totals are now summed from book_daily_stats
+    op.drop_table('daily_circulation')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table(
+        'daily_circulation',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('borrows', sa.Integer(), nullable=False),
+        sa.Column('returns', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day'),
+    )
+    op.execute(
+        "INSERT INTO daily_circulation (day, borrows, returns) "
+        "SELECT day, SUM(borrows), SUM(returns) FROM book_daily_stats GROUP BY day"
+    )
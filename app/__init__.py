@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# Every module reads its settings from os.environ at import time, and all of them import through here first
+load_dotenv()
@@ -0,0 +1,168 @@
+import abc
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# "memory" keeps a per-process LRU; "redis" shares entries between workers
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+CACHES = {}
+
+
+class CacheBackend(abc.ABC):
+    """Interface shared by cache backends; shared backends require JSON-serializable values."""
+
+    hits = 0
+    misses = 0
+
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        ...
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl: float | None = None):
+        ...
+
+    @abc.abstractmethod
+    def add(self, key, value, ttl: float | None = None) -> bool:
+        """Store value only if key is absent or expired; True when this call stored it."""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        ...
+
+    @abc.abstractmethod
+    def clear(self):
+        ...
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TTLCache(CacheBackend):
+    """Bounded in-process LRU cache whose entries expire after a time-to-live."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def add(self, key, value, ttl: float | None = None) -> bool:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return False
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] > time.monotonic():
+                return False
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._data), "maxsize": self.maxsize}
+
+
+class RedisCache(CacheBackend):
+    """Cache shared across worker processes through any Redis-protocol server."""
+
+    def __init__(self, prefix: str, ttl: float = 60.0, url: str = CACHE_REDIS_URL):
+        import redis
+
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, key) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get(self, key, default=None):
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl > 0:
+            self._client.set(self._key(key), json.dumps(value), px=int(ttl * 1000))
+
+    def add(self, key, value, ttl: float | None = None) -> bool:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return False
+        return bool(self._client.set(self._key(key), json.dumps(value), px=int(ttl * 1000), nx=True))
+
+    def delete(self, key):
+        self._client.delete(self._key(key))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=f"{self.prefix}:*"):
+            self._client.delete(key)
+
+
+def register_cache(name: str, cache: CacheBackend) -> CacheBackend:
+    CACHES[name] = cache
+    return cache
+
+
+def create_cache(name: str, maxsize: int, ttl: float) -> CacheBackend:
+    """Build and register a cache for serialized values using the configured backend."""
+    if CACHE_BACKEND == "redis":
+        return register_cache(name, RedisCache(prefix=name, ttl=ttl))
+    return register_cache(name, TTLCache(maxsize, ttl))
+
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in CACHES.items()}
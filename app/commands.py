@@ -0,0 +1,80 @@
+"""Maintenance commands, e.g. `python -m app.commands reconcile-borrow-counts`."""
+import argparse
+import asyncio
+import subprocess
+import sys
+from collections import defaultdict
+
+from app.database import SessionLocal
+import app.models  # noqa: F401  (registers every mapper before services run queries)
+from app.services.count_service import CountService
+from app.services.member_service import MemberService
+from app.services.overdue_service import run_overdue_sweep
+from app.services.stats_service import StatsService
+
+
+def reconcile_borrow_counts() -> None:
+    with SessionLocal() as db:
+        fixed = MemberService.reconcile_active_borrow_counts(db)
+    print(f"Reconciled active_borrow_count for {fixed} member(s)")
+
+
+def sweep_overdue() -> None:
+    result = asyncio.run(run_overdue_sweep())
+    print(f"{result['overdue_loans']} overdue loan(s) across {result['members']} member(s) and {result['books']} book(s)")
+
+
+def rebuild_stats() -> None:
+    with SessionLocal() as db:
+        counts = StatsService.rebuild(db)
+    print(", ".join(f"{table}: {count} row(s)" for table, count in counts.items()))
+
+
+def refresh_row_counts() -> None:
+    with SessionLocal() as db:
+        counts = CountService.refresh(db)
+        db.commit()
+    print(", ".join(f"{table}: {count} row(s)" for table, count in counts.items()))
+
+
+def profile_startup() -> None:
+    # A fresh interpreter, so nothing is already imported; -X importtime reports microseconds per module
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    by_package = defaultdict(int)
+    slowest = []
+    for line in stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        self_us, name = int(fields[0]), fields[2].strip()
+        by_package[name.split(".")[0]] += self_us
+        slowest.append((self_us, name))
+    print(f"import app.main: {sum(by_package.values()) / 1000:.0f} ms")
+    for package, total in sorted(by_package.items(), key=lambda item: -item[1])[:15]:
+        print(f"  {package:<30} {total / 1000:8.1f} ms")
+    print("Slowest modules (self time):")
+    for self_us, name in sorted(slowest, reverse=True)[:10]:
+        print(f"  {name:<50} {self_us / 1000:8.1f} ms")
+
+
+COMMANDS = {
+    "reconcile-borrow-counts": reconcile_borrow_counts,
+    "sweep-overdue": sweep_overdue,
+    "rebuild-stats": rebuild_stats,
+    "refresh-row-counts": refresh_row_counts,
+    "profile-startup": profile_startup,
+}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args(argv)
+    COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,163 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
+import logging
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from app.pool import POOL_MONITORS, MonitoredAsyncQueuePool, MonitoredQueuePool, PoolMonitor, attach_monitor
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# "sync" keeps the threadpool + psycopg2 stack, "async" serves requests from an AsyncEngine
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync").lower()
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# Pool sizing is per process: each worker holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+# Connections each worker opens at startup so its first requests skip the connect handshake
+DB_POOL_WARM = int(os.getenv("DB_POOL_WARM", "0"))
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # milliseconds
+
+ENGINES = []
+
+logger = logging.getLogger(__name__)
+
+
+def _engine_options(url: str, is_async: bool) -> dict:
+    parsed = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if parsed.get_backend_name() == "sqlite":
+        # Sessions hop between threadpool threads, and the driver-level timeout doubles as busy_timeout
+        options["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT / 1000}
+        if parsed.database in (None, "", ":memory:"):
+            # In-memory databases live in a single connection, so keep SQLAlchemy's default pool
+            return options
+    options.update(
+        poolclass=MonitoredAsyncQueuePool if is_async else MonitoredQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+def _tune_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT}")
+    if SQLITE_JOURNAL_MODE:
+        # WAL lets readers proceed while a writer holds the lock
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    if SQLITE_SYNCHRONOUS:
+        cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    cursor.close()
+
+
+def create_db_engine(url: str, name: str, is_async: bool = False):
+    """Build an engine with the configured pool and register its pool monitor under `name`."""
+    if is_async:
+        db_engine = create_async_engine(url, **_engine_options(url, is_async))
+        sync_engine = db_engine.sync_engine
+    else:
+        db_engine = sync_engine = create_engine(url, **_engine_options(url, is_async))
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _tune_sqlite)
+    POOL_MONITORS[name] = PoolMonitor(name)
+    attach_monitor(sync_engine.pool, POOL_MONITORS[name])
+    ENGINES.append(db_engine)
+    return db_engine
+
+
+def _serving_engines() -> list:
+    # In async mode the sync engines only back maintenance commands, so there is nothing to warm
+    if DATABASE_MODE == "async":
+        return [db_engine for db_engine in ENGINES if isinstance(db_engine, AsyncEngine)]
+    return [db_engine for db_engine in ENGINES if not isinstance(db_engine, AsyncEngine)]
+
+
+def _warm_sync(db_engine, count: int) -> None:
+    connections = [db_engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.close()
 
-engine = create_engine(DATABASE_URL)
+
+async def warm_pools(count: int = DB_POOL_WARM) -> None:
+    """Fill each serving pool with up to `count` idle connections."""
+    count = min(count, DB_POOL_SIZE)
+    for db_engine in _serving_engines():
+        try:
+            if isinstance(db_engine, AsyncEngine):
+                connections = [await db_engine.connect() for _ in range(count)]
+                for connection in connections:
+                    await connection.close()
+            else:
+                await run_in_threadpool(_warm_sync, db_engine, count)
+        except Exception:
+            # An unreachable database should fail requests, not stop the worker from starting
+            logger.warning("Could not warm the pool for %s", db_engine.url.render_as_string(), exc_info=True)
+
+
+def reset_pools_after_fork() -> None:
+    """Drop connections inherited from the parent process without closing the parent's sockets."""
+    for db_engine in ENGINES:
+        getattr(db_engine, "sync_engine", db_engine).dispose(close=False)
+
+
+async def dispose_engines() -> None:
+    for db_engine in ENGINES:
+        if isinstance(db_engine, AsyncEngine):
+            await db_engine.dispose()
+        else:
+            await run_in_threadpool(db_engine.dispose)
+
+
+engine = create_db_engine(DATABASE_URL, "primary")
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 Base = declarative_base()
+
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DATABASE_MODE == "async":
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+    async_engine = create_db_engine(ASYNC_DATABASE_URL, "primary_async", is_async=True)
+    # Responses are serialized after the service returns, outside the greenlet that can
+    # lazy-load, so committed objects must keep their loaded state.
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+async def run_sync_session(db, fn, *args, **kwargs):
+    """Run a sync service function against either session flavour without blocking the loop."""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def release_session(db) -> None:
+    """Hand a request session's connection back to the pool before a long-lived response."""
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        await run_in_threadpool(db.close)
@@ -1,11 +1,13 @@
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Request
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal
+from app.database import AsyncSessionLocal, DATABASE_MODE, SessionLocal
 from app.models.users import Users
-from app.services.auth_service import AuthService, oauth2_bearer
+from app.replicas import client_key, replica_set
+from app.services.auth_service import AsyncAuthService, oauth2_bearer
 
 
 def get_db():
@@ -16,12 +18,63 @@ def get_db():
         db.close()
 
 
-def get_current_user(
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+get_session = get_async_db if DATABASE_MODE == "async" else get_db
+
+
+def get_read_db(request: Request, primary: Annotated[Session, Depends(get_db)]):
+    # The primary session is lazy, so it only opens a connection when no replica can serve
+    replica = replica_set.choose(client_key(request.headers, request.client))
+    if replica is None:
+        yield primary
+        return
+    db = replica.SessionLocal()
+    try:
+        db.connection()
+    except DBAPIError:
+        db.close()
+        replica.mark_down()
+        yield primary
+        return
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request, primary: Annotated[Session, Depends(get_async_db)]):
+    replica = replica_set.choose(client_key(request.headers, request.client))
+    if replica is None:
+        yield primary
+        return
+    db = replica.AsyncSessionLocal()
+    try:
+        await db.connection()
+    except DBAPIError:
+        await db.close()
+        replica.mark_down()
+        yield primary
+        return
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+get_read_session = get_async_read_db if DATABASE_MODE == "async" else get_read_db
+
+
+async def get_current_user(
     token: Annotated[str, Depends(oauth2_bearer)],
-    db: Annotated[Session, Depends(get_db)]
+    db: Annotated[Session, Depends(get_session)]
 ) -> Users:
-    return AuthService.get_current_user(token, db)
+    return await AsyncAuthService.get_current_user(token, db)
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[Session, Depends(get_session)]
+read_db_dependency = Annotated[Session, Depends(get_read_session)]
 user_dependency = Annotated[Users, Depends(get_current_user)]
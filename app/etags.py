@@ -0,0 +1,29 @@
+import hashlib
+
+from fastapi import Request, Response
+
+
+def entity_etag(kind: str, entity_id: int, version: int) -> str:
+    return f'"{kind}-{entity_id}-v{version}"'
+
+
+def list_etag(rows) -> str:
+    """Strong ETag for a page, built from the (id, version) pairs it contains."""
+    digest = hashlib.sha1(",".join(f"{row.id}:{row.version}" for row in rows).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def if_none_match(request: Request) -> str | None:
+    return request.headers.get("if-none-match")
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so a W/ prefix on the client side still matches
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,116 @@
+import hashlib
+import os
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.exception_handlers import http_exception_handler
+from fastapi.routing import APIRoute
+
+from app.cache import create_cache
+from app.services.auth_service import AuthService
+
+# How long a completed response is replayed for retries carrying the same key
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# A claim whose request never finished (e.g. the worker died) is released after this many seconds
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+
+# Use CACHE_BACKEND=redis with several workers, otherwise a retry that lands on another worker runs again
+stored_responses = create_cache("idempotency", IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL)
+
+
+def _fingerprint(request: Request, body: bytes) -> str:
+    digest = hashlib.sha256(f"{request.method} {request.url.path}?{request.url.query}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+# Recomputed for the replayed body, or only meaningful on the original response
+UNREPLAYED_HEADERS = {"content-length", "content-type", "set-cookie", "date", "server"}
+
+
+def _owner(request: Request) -> str:
+    """Scope keys to the signed-in user, so a retry after logging in again still matches; else to the address."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    subject = AuthService.token_subject(token) if scheme.lower() == "bearer" and token else None
+    identity = f"user:{subject}" if subject else f"ip:{request.client[0] if request.client else ''}"
+    return hashlib.sha256(identity.encode()).hexdigest()[:32]
+
+
+def _replay(entry: dict) -> Response:
+    response = Response(content=entry["body"], status_code=entry["status_code"], media_type=entry["media_type"])
+    for name, value in entry.get("headers", ()):
+        response.headers.append(name, value)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+class IdempotentRoute(APIRoute):
+    """Answers a retried POST that carries an Idempotency-Key with the stored first response."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            # Uploads are left alone: imports already skip duplicate rows, and fingerprinting would buffer the file
+            if (
+                request.method != "POST"
+                or key is None
+                or request.headers.get("content-type", "").startswith("multipart/")
+            ):
+                return await handler(request)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+                )
+
+            # Keys are scoped per user, so one user can never be handed another's response
+            cache_key = f"{_owner(request)}:{key}"
+            fingerprint = _fingerprint(request, await request.body())
+            claim = {"fingerprint": fingerprint, "status_code": None}
+            if not stored_responses.add(cache_key, claim, ttl=IDEMPOTENCY_LOCK_TIMEOUT):
+                entry = stored_responses.get(cache_key)
+                if entry is None:
+                    # Expired between the two calls; treat as a fresh request
+                    return await handler(request)
+                if entry["fingerprint"] != fingerprint:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                        detail="Idempotency-Key was already used for a different request"
+                    )
+                if entry["status_code"] is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="A request with this Idempotency-Key is still in progress",
+                        headers={"Retry-After": "1"},
+                    )
+                return _replay(entry)
+
+            try:
+                response = await handler(request)
+            except HTTPException as exc:
+                # Client errors such as "no copies available" are part of the outcome and replay too
+                response = await http_exception_handler(request, exc)
+            except BaseException:
+                stored_responses.delete(cache_key)
+                raise
+            body = getattr(response, "body", None)
+            if response.status_code >= 500 or body is None:
+                stored_responses.delete(cache_key)
+                return response
+            stored_responses.set(cache_key, {
+                "fingerprint": fingerprint,
+                "status_code": response.status_code,
+                "media_type": response.media_type,
+                "headers": [
+                    (name, value) for name, value in response.headers.items() if name not in UNREPLAYED_HEADERS
+                ],
+                "body": body.decode(),
+            })
+            return response
+
+        return idempotent_handler
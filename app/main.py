@@ -1,10 +1,35 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
+from app.database import DB_POOL_WARM, dispose_engines, warm_pools
+from app.hashing import password_hasher
+from app.metrics import METRICS_ENABLED, MetricsMiddleware, instrument_engines
+from app.query_diagnostics import QUERY_DIAGNOSTICS, QueryDiagnosticsMiddleware, install_hooks
+from app.replicas import ReadYourWritesMiddleware
+from app.services.overdue_service import OVERDUE_SWEEP_INTERVAL, overdue_sweeper
 from app.routers.book import router as books_router
 from app.routers.member import router as members_router
 from app.routers.borrow import router as borrows_router
 from app.routers.auth import router as auth_router
+from app.routers.admin import router as admin_router
+from app.routers.stats import router as stats_router
+from app.routers.metrics import router as metrics_router
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_POOL_WARM > 0:
+        await warm_pools()
+    sweeper = asyncio.create_task(overdue_sweeper()) if OVERDUE_SWEEP_INTERVAL > 0 else None
+    yield
+    if sweeper:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
+    password_hasher.shutdown()
+    await dispose_engines()
 
-app = FastAPI(title="Library API")
+app = FastAPI(title="Library API", lifespan=lifespan)
 
 @app.get("/")
 def root():
@@ -14,3 +39,16 @@ app.include_router(auth_router)
 app.include_router(books_router)
 app.include_router(members_router)
 app.include_router(borrows_router)
+app.include_router(admin_router)
+app.include_router(stats_router)
+
+app.add_middleware(ReadYourWritesMiddleware)
+
+if METRICS_ENABLED:
+    instrument_engines()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+if QUERY_DIAGNOSTICS:
+    install_hooks()
+    app.add_middleware(QueryDiagnosticsMiddleware)
@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.cache import cache_stats
+from app.pool import WAIT_BUCKETS, pool_stats
+
+# When disabled neither the middleware nor the SQL hooks are installed, so there is no per-request cost
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RequestTimings:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f"total;dur={total_seconds * 1000:.1f}"
+        )
+
+
+# Set per request by the middleware; the object is shared with threadpool workers and
+# greenlets because both run inside a copy of the request's context.
+current_timings: ContextVar[RequestTimings | None] = ContextVar("current_timings", default=None)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float, bounds) -> None:
+        for index, bound in enumerate(bounds):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(value)
+
+
+def _render_histogram(lines: list, name: str, labels: dict, bounds, counts, total: float, count: int) -> None:
+    cumulative = 0
+    for bound, bucket in zip(bounds, counts):
+        cumulative += bucket
+        lines.append(f"{name}_bucket{_labels(**labels, le=_bound(bound))} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {total}")
+    lines.append(f"{name}_count{_labels(**labels)} {count}")
+
+
+class MetricsRegistry:
+    """Per-route request and database counters rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.latency = {}
+        self.db_queries = {}
+        self.db_seconds = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, timings: RequestTimings) -> None:
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = _Histogram(len(LATENCY_BUCKETS))
+            histogram.observe(seconds, LATENCY_BUCKETS)
+            self.db_queries[key] = self.db_queries.get(key, 0) + timings.queries
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + timings.db_seconds
+
+    def clear(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.latency.clear()
+            self.db_queries.clear()
+            self.db_seconds.clear()
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append("# HELP http_requests_total Requests by route template and status code.")
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+            lines.append("# HELP http_request_duration_seconds Request latency by route template.")
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for (method, route), histogram in sorted(self.latency.items()):
+                _render_histogram(
+                    lines, "http_request_duration_seconds", {"method": method, "route": route},
+                    LATENCY_BUCKETS, histogram.counts, histogram.total, histogram.count,
+                )
+
+            lines.append("# HELP db_queries_total SQL statements executed while serving each route.")
+            lines.append("# TYPE db_queries_total counter")
+            for (method, route), count in sorted(self.db_queries.items()):
+                lines.append(f"db_queries_total{_labels(method=method, route=route)} {count}")
+
+            lines.append("# HELP db_query_duration_seconds_total Time spent executing SQL for each route.")
+            lines.append("# TYPE db_query_duration_seconds_total counter")
+            for (method, route), seconds in sorted(self.db_seconds.items()):
+                lines.append(f"db_query_duration_seconds_total{_labels(method=method, route=route)} {seconds}")
+
+        pools = pool_stats()
+        lines.append("# HELP db_pool_checked_out Connections currently checked out of the pool.")
+        lines.append("# TYPE db_pool_checked_out gauge")
+        for name, stats in pools.items():
+            if "checked_out" in stats:
+                lines.append(f"db_pool_checked_out{_labels(pool=name)} {stats['checked_out']}")
+        lines.append("# HELP db_pool_overflow Connections opened beyond the pool size.")
+        lines.append("# TYPE db_pool_overflow gauge")
+        for name, stats in pools.items():
+            if "overflow" in stats:
+                lines.append(f"db_pool_overflow{_labels(pool=name)} {stats['overflow']}")
+        lines.append("# HELP db_pool_timeouts_total Checkouts that gave up waiting for a connection.")
+        lines.append("# TYPE db_pool_timeouts_total counter")
+        for name, stats in pools.items():
+            lines.append(f"db_pool_timeouts_total{_labels(pool=name)} {stats['timeouts']}")
+        lines.append("# HELP db_pool_wait_seconds Time spent waiting for a pooled connection.")
+        lines.append("# TYPE db_pool_wait_seconds histogram")
+        for name, stats in pools.items():
+            cumulative = list(stats["wait_seconds_histogram"].values())
+            counts = [value - previous for value, previous in zip(cumulative, [0] + cumulative[:-1])]
+            _render_histogram(
+                lines, "db_pool_wait_seconds", {"pool": name},
+                WAIT_BUCKETS, counts, stats["wait_seconds_sum"], stats["checkouts"],
+            )
+
+        caches = cache_stats()
+        lines.append("# HELP cache_hits_total Cache lookups that found an entry.")
+        lines.append("# TYPE cache_hits_total counter")
+        for name, stats in caches.items():
+            lines.append(f"cache_hits_total{_labels(cache=name)} {stats['hits']}")
+        lines.append("# HELP cache_misses_total Cache lookups that missed.")
+        lines.append("# TYPE cache_misses_total counter")
+        for name, stats in caches.items():
+            lines.append(f"cache_misses_total{_labels(cache=name)} {stats['misses']}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, so a statement that fails leaves nothing behind on the pooled connection
+    if current_timings.get() is not None and context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = current_timings.get()
+    started = getattr(context, "_metrics_started", None)
+    if timings is not None and started is not None:
+        timings.queries += 1
+        timings.db_seconds += time.perf_counter() - started
+
+
+def instrument_engines() -> None:
+    """Time SQL on every Engine, which covers the primary engine and the sync side of async ones."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware so streaming responses pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timings.reset(token)
+            # Label by route template, not raw path, so ids do not explode label cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            registry.observe_request(scope["method"], route, status_code, time.perf_counter() - start, timings)
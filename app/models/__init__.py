@@ -3,5 +3,8 @@ from .book import Book
 from .member import Member
 from .borrow import BorrowRecord
 from .users import Users
+from .overdue import OverdueSummary
+from .stats import BookDailyStats, MemberDailyStats
+from .counts import RowCount
 
 metadata = Base.metadata
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, DDL, Index, event, literal_column, text
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -11,3 +11,31 @@ class Book(Base):
     total_copies = Column(Integer, nullable=False)
     available_copies = Column(Integer, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by every UPDATE (ORM or Core) and used to derive strong ETags
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"), onupdate=literal_column("version + 1"))
+
+
+# Copies on loan, so utilization stats read the busiest titles straight off the index
+Index("ix_books_on_loan", Book.total_copies - Book.available_copies)
+
+
+# SQLite has no trigram/tsvector indexes, so full-text search there is served by an
+# external-content FTS5 table kept in sync with triggers. Postgres gets its GIN
+# indexes from the Alembic migration instead.
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5("
+    "title, author, content='books', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN "
+    "INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN "
+    "INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE ON books BEGIN "
+    "INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author); "
+    "INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author); END",
+]
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(Book.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    Book.__table__, "after_drop", DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite")
+)
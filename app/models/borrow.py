@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, literal_column, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -12,6 +12,26 @@ class BorrowRecord(Base):
     borrowed_at = Column(DateTime(timezone=True), server_default=func.now())
     due_date = Column(DateTime(timezone=True), nullable=False)
     returned_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped by every UPDATE (ORM or Core) and used to derive strong ETags
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"), onupdate=literal_column("version + 1"))
     book = relationship("Book")
     member = relationship("Member")
 
+    __table_args__ = (
+        # Member history pages: filter on member, range/order on borrowed_at, id as tiebreaker
+        Index("ix_borrow_records_member_borrowed", "member_id", "borrowed_at", "id"),
+        # Active-borrow checks only ever look at open loans
+        Index(
+            "ix_borrow_records_member_active", "member_id",
+            postgresql_where=text("returned_at IS NULL"),
+            sqlite_where=text("returned_at IS NULL"),
+        ),
+        Index("ix_borrow_records_book_id", "book_id"),
+        # Overdue scans walk open loans in due_date order and never touch returned ones
+        Index(
+            "ix_borrow_records_overdue", "due_date", "id",
+            postgresql_where=text("returned_at IS NULL"),
+            sqlite_where=text("returned_at IS NULL"),
+        ),
+    )
+
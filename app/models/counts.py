@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+# Exact row totals for large tables, adjusted in the same transaction as each insert/delete so an
+# unfiltered list can report its size without COUNT(*). Recompute with
+# `python -m app.commands refresh-row-counts` after loading rows behind the services' back.
+
+class RowCount(Base):
+    __tablename__ = "row_counts"
+
+    table_name = Column(String, primary_key=True)
+    row_count = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, literal_column, text
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -9,3 +9,7 @@ class Member(Base):
     full_name = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Open loans, maintained by BorrowService; recompute with `python -m app.commands reconcile-borrow-counts`
+    active_borrow_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    # Bumped by every UPDATE (ORM or Core) and used to derive strong ETags
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"), onupdate=literal_column("version + 1"))
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.database import Base
+
+class OverdueSummary(Base):
+    """Overdue loan counts per member or book, rebuilt by the periodic overdue sweep."""
+    __tablename__ = "overdue_summaries"
+
+    scope = Column(String(10), primary_key=True)  # "member" or "book"
+    entity_id = Column(Integer, primary_key=True)
+    overdue_count = Column(Integer, nullable=False)
+    oldest_due_date = Column(DateTime(timezone=True), nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer
+from app.database import Base
+
+# Daily circulation aggregates kept in step with borrow/return by StatsService, so
+# dashboards read O(days) or O(books in window) rows instead of scanning borrow_records.
+# Rebuild with `python -m app.commands rebuild-stats`.
+
+class BookDailyStats(Base):
+    __tablename__ = "book_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    borrows = Column(Integer, nullable=False, default=0)
+    returns = Column(Integer, nullable=False, default=0)
+
+
+class MemberDailyStats(Base):
+    __tablename__ = "member_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    member_id = Column(Integer, ForeignKey("members.id"), primary_key=True)
+    borrows = Column(Integer, nullable=False, default=0)
+    returns = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+import threading
+from collections import defaultdict
+
+from app.cache import CACHE_REDIS_URL
+
+# "memory" fans out within one process; "redis" also reaches subscribers connected to other workers
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "memory").lower()
+PUBSUB_REDIS_URL = os.getenv("PUBSUB_REDIS_URL", CACHE_REDIS_URL)
+
+
+class Subscription:
+    """Latest message per topic, so a slow or idle subscriber holds at most one pending message per topic.
+
+    Messages that carry a "version" are dropped unless newer than the last one seen for their topic,
+    since publishers on different threads or workers can deliver them out of order.
+    """
+
+    def __init__(self, broker, topics: list[str], loop: asyncio.AbstractEventLoop):
+        self.broker = broker
+        self.topics = topics
+        self._loop = loop
+        self._pending = {}
+        self._versions = {}
+        self._ready = asyncio.Event()
+
+    def deliver(self, topic: str, message) -> None:
+        # Called from whichever thread published; the subscriber's loop applies it
+        try:
+            self._loop.call_soon_threadsafe(self._push, topic, message)
+        except RuntimeError:
+            # The subscriber's event loop is gone
+            self.close()
+
+    def _push(self, topic: str, message) -> None:
+        version = message.get("version") if isinstance(message, dict) else None
+        if version is not None:
+            if version <= self._versions.get(topic, version - 1):
+                return
+            self._versions[topic] = version
+        self._pending[topic] = message
+        self._ready.set()
+
+    def skip_to(self, topic: str, version: int) -> None:
+        """Treat `version` of `topic` as already seen, e.g. because the subscriber read it directly."""
+        if version <= self._versions.get(topic, version - 1):
+            return
+        self._versions[topic] = version
+        pending = self._pending.get(topic)
+        if isinstance(pending, dict) and pending.get("version", version) <= version:
+            del self._pending[topic]
+
+    async def get(self, timeout: float) -> list:
+        """Wait up to `timeout` seconds for messages; an empty list means none arrived."""
+        if not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        messages = list(self._pending.values())
+        self._pending.clear()
+        return messages
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process fan-out: publishing touches only the subscribers of that topic, and idle ones cost nothing."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics: list[str]) -> Subscription:
+        subscription = Subscription(self, topics, asyncio.get_running_loop())
+        with self._lock:
+            for topic in topics:
+                self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def publish(self, topic: str, message) -> None:
+        self._fan_out(topic, message)
+
+    def _fan_out(self, topic: str, message) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            subscription.deliver(topic, message)
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscriptions = {id(sub) for subscribers in self._subscribers.values() for sub in subscribers}
+            return {
+                "backend": type(self).__name__,
+                "topics": len(self._subscribers),
+                "subscriptions": len(subscriptions),
+            }
+
+
+class RedisBroker(LocalBroker):
+    """Publishes through Redis; one listener thread per process feeds the local fan-out."""
+
+    def __init__(self, url: str = PUBSUB_REDIS_URL, prefix: str = "pubsub"):
+        import redis
+
+        super().__init__()
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, topics: list[str]) -> Subscription:
+        # Only processes that actually serve streams pay for the listener
+        with self._listener_lock:
+            if self._listener is None:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(**{f"{self.prefix}:*": self._on_message})
+                self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        return super().subscribe(topics)
+
+    def publish(self, topic: str, message) -> None:
+        self._client.publish(f"{self.prefix}:{topic}", json.dumps(message))
+
+    def _on_message(self, message) -> None:
+        topic = message["channel"].decode().removeprefix(f"{self.prefix}:")
+        self._fan_out(topic, json.loads(message["data"]))
+
+
+def create_broker() -> LocalBroker:
+    if PUBSUB_BACKEND == "redis":
+        return RedisBroker()
+    return LocalBroker()
+
+
+broker = create_broker()
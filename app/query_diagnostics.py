@@ -0,0 +1,142 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Development/staging aid: per-request query tracking, slow-query EXPLAINs and N+1 warnings
+QUERY_DIAGNOSTICS = os.getenv("QUERY_DIAGNOSTICS", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+REPEATED_QUERY_THRESHOLD = int(os.getenv("REPEATED_QUERY_THRESHOLD", "5"))
+
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+logger = logging.getLogger(__name__)
+
+_PARAMS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    """Reduce a statement to its shape so the same query with different values compares equal."""
+    shape = " ".join(statement.split())
+    shape = _PARAMS.sub("?", shape)
+    shape = _LITERALS.sub("?", shape)
+    return _LISTS.sub("(?, ...)", shape)
+
+
+class QueryTracker:
+    """Statement shapes and timings collected for one request or one test."""
+
+    def __init__(self):
+        self.statements = []
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def record(self, shape: str, seconds: float) -> None:
+        with self._lock:
+            self.statements.append((shape, seconds))
+
+    def repeated(self, threshold: int = REPEATED_QUERY_THRESHOLD) -> list[tuple[str, int]]:
+        counts = Counter(shape for shape, _ in self.statements)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+    def report(self) -> str:
+        counts = Counter(shape for shape, _ in self.statements)
+        return "\n".join(f"  {count} x {shape}" for shape, count in counts.most_common())
+
+
+current_tracker: ContextVar[QueryTracker | None] = ContextVar("current_tracker", default=None)
+# Trackers that see every statement in the process, e.g. a test whose app runs in another thread
+_global_trackers: list[QueryTracker] = []
+
+
+def explain(conn, statement: str, parameters) -> str:
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name, "EXPLAIN ")
+    conn.info["explaining"] = True
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+        return "\n".join(" | ".join(str(value) for value in row) for row in rows)
+    except Exception as exc:
+        return f"EXPLAIN failed: {exc}"
+    finally:
+        conn.info["explaining"] = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, so a statement that fails leaves nothing behind on the pooled connection
+    if context is not None:
+        context._diagnostics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_diagnostics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if conn.info.get("explaining"):
+        return
+    trackers = [tracker for tracker in (current_tracker.get(), *_global_trackers) if tracker is not None]
+    if not trackers and not QUERY_DIAGNOSTICS:
+        return
+
+    shape = normalize_statement(statement)
+    for tracker in trackers:
+        tracker.record(shape, elapsed)
+    # Only plain SELECTs are explained; they have already run, so re-planning them is harmless
+    if QUERY_DIAGNOSTICS and elapsed * 1000 >= SLOW_QUERY_MS and not executemany \
+            and statement.lstrip().upper().startswith("SELECT"):
+        logger.warning(
+            "Slow query (%.1f ms): %s\n%s", elapsed * 1000, shape, explain(conn, statement, parameters)
+        )
+
+
+def install_hooks() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries():
+    """Collect every statement the process runs inside the block, regardless of thread."""
+    install_hooks()
+    tracker = QueryTracker()
+    _global_trackers.append(tracker)
+    try:
+        yield tracker
+    finally:
+        _global_trackers.remove(tracker)
+
+
+class QueryDiagnosticsMiddleware:
+    """Tracks the statements of each request and warns about repeated statement shapes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracker = QueryTracker()
+        token = current_tracker.set(tracker)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tracker.reset(token)
+            for shape, count in tracker.repeated():
+                logger.warning(
+                    "Possible N+1 in %s %s: %d x %s", scope["method"], scope["path"], count, shape
+                )
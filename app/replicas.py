@@ -0,0 +1,129 @@
+import hashlib
+import itertools
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.cache import create_cache
+from app.database import DATABASE_MODE, ENGINES, create_db_engine, to_async_url
+
+# Comma-separated URLs of read replicas; empty sends every query to the primary
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# A replica that fails to connect is skipped for this many seconds before it is tried again
+REPLICA_RETRY_AFTER = float(os.getenv("REPLICA_RETRY_AFTER", "30"))
+# After a write, the same client reads from the primary for this long so it sees its own change
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Shared between workers when CACHE_BACKEND=redis, so stickiness survives load balancing
+recent_writers = create_cache("read_your_writes", maxsize=10000, ttl=READ_YOUR_WRITES_SECONDS)
+
+
+class Replica:
+    def __init__(self, url: str, name: str):
+        self.name = name
+        self.down_until = 0.0
+        self.failures = 0
+        self.engine = create_db_engine(url, name)
+        self.SessionLocal = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+        event.listen(self.engine, "handle_error", self._on_error)
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+        if DATABASE_MODE == "async":
+            self.async_engine = create_db_engine(to_async_url(url), f"{name}_async", is_async=True)
+            self.AsyncSessionLocal = async_sessionmaker(
+                bind=self.async_engine, autoflush=False, expire_on_commit=False
+            )
+            event.listen(self.async_engine.sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect:
+            self.mark_down()
+
+    @property
+    def healthy(self) -> bool:
+        return self.down_until <= time.monotonic()
+
+    def mark_down(self) -> None:
+        self.failures += 1
+        self.down_until = time.monotonic() + REPLICA_RETRY_AFTER
+
+    def dispose(self) -> None:
+        self.engine.dispose()
+        ENGINES.remove(self.engine)
+        if self.async_engine is not None:
+            self.async_engine.sync_engine.dispose()
+            ENGINES.remove(self.async_engine)
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "failures": self.failures,
+            "retry_in": max(self.down_until - time.monotonic(), 0.0),
+        }
+
+
+class ReplicaSet:
+    """Round-robins reads over healthy replicas, falling back to the primary when none can serve."""
+
+    def __init__(self, urls: list[str]):
+        self.replicas: list[Replica] = []
+        self._lock = threading.Lock()
+        self.configure(urls)
+
+    def configure(self, urls: list[str]) -> None:
+        for replica in self.replicas:
+            replica.dispose()
+        self.replicas = [Replica(url, f"replica_{index}") for index, url in enumerate(urls)]
+        self._cycle = itertools.cycle(self.replicas)
+
+    def choose(self, client: str) -> Replica | None:
+        if not self.replicas or recent_writers.get(client):
+            return None
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = next(self._cycle)
+                if replica.healthy:
+                    return replica
+        return None
+
+    def pin(self, client: str) -> None:
+        if self.replicas:
+            recent_writers.set(client, True)
+
+    def stats(self) -> dict:
+        return {replica.name: replica.stats() for replica in self.replicas}
+
+
+def client_key(headers: dict, client) -> str:
+    """Identify a client by its bearer token, or by address for anonymous requests, without storing either."""
+    identity = headers.get("authorization") or (client[0] if client else "")
+    return hashlib.sha256(identity.encode()).hexdigest()[:32]
+
+
+replica_set = ReplicaSet(DATABASE_REPLICA_URLS)
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client to the primary for a short while after any successful write request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not replica_set.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+                replica_set.pin(client_key(headers, scope.get("client")))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+
+from app.cache import cache_stats
+from app.dependencies import user_dependency
+from app.hashing import password_hasher
+from app.pool import pool_stats
+from app.pubsub import broker
+from app.replicas import replica_set
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get("/cache")
+async def get_cache_stats(current_user: user_dependency):
+    return cache_stats()
+
+
+@router.get("/password-hasher")
+async def get_password_hasher_stats(current_user: user_dependency):
+    return password_hasher.stats()
+
+
+@router.get("/pool")
+async def get_pool_stats(current_user: user_dependency):
+    return pool_stats()
+
+
+@router.get("/pubsub")
+async def get_pubsub_stats(current_user: user_dependency):
+    return broker.stats()
+
+
+@router.get("/replicas")
+async def get_replica_stats(current_user: user_dependency):
+    return replica_set.stats()
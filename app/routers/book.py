@@ -1,50 +1,119 @@
 from typing import List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request, Response, UploadFile
 
 from app import schemas
-from app.dependencies import db_dependency, user_dependency
-from app.services.book_service import BookService
+from app.dependencies import db_dependency, read_db_dependency, user_dependency
+from app.etags import entity_etag, etag_matches, if_none_match, list_etag, not_modified
+from app.idempotency import IdempotentRoute
+from app.pagination import set_next_cursor, set_total_count
+from app.serialization import rows_response
+from app.services.availability_service import MAX_STREAM_BOOKS, AsyncAvailabilityService
+from app.services.book_service import AsyncBookService
+from app.services.export_service import ExportService
+from app.services.import_service import AsyncImportService, detect_format
 
-router = APIRouter(prefix="/books", tags=["Books"])
+router = APIRouter(prefix="/books", tags=["Books"], route_class=IdempotentRoute)
 
 
 @router.post("/", response_model=schemas.BookResponse)
-def create_book(
+async def create_book(
     book_in: schemas.BookCreate,
     db: db_dependency,
     current_user: user_dependency
 ):
-    return BookService.create(db, book_in)
+    return await AsyncBookService.create(db, book_in)
 
-@router.get("/", response_model=List[schemas.BookResponse])
-def get_all_books(
+@router.post("/import", response_model=schemas.ImportReport)
+async def import_books(
+    file: UploadFile,
     db: db_dependency,
+    current_user: user_dependency
+):
+    fmt = detect_format(file.filename, file.content_type)
+    return await AsyncImportService.import_books(db, file.file, fmt)
+
+@router.get("/", response_model=List[schemas.BookResponse])
+async def get_all_books(
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
     author: str = None,
     title: str = None,
     available_only: bool = None,
     skip: int = 0,
+    limit: int = 10,
+    cursor: str = None,
+    include_total: bool = False
+):
+    conditional = if_none_match(request)
+    if conditional:
+        versions = await AsyncBookService.get_all_versions(db, author, title, available_only, skip, limit, cursor)
+        etag = list_etag(versions)
+        if etag_matches(conditional, etag):
+            return not_modified(etag)
+    books = await AsyncBookService.get_all(db, author, title, available_only, skip, limit, cursor)
+    response.headers["ETag"] = list_etag(books)
+    set_next_cursor(response, books, limit)
+    if include_total:
+        set_total_count(response, *await AsyncBookService.count(db, author, title, available_only))
+    return rows_response(schemas.BookResponse, books, response)
+
+@router.get("/export")
+async def export_books(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    available_only: bool = None,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    gzip: bool = False
+):
+    stmt = ExportService.books_statement(available_only)
+    return ExportService.stream(db, stmt, "books", fmt, gzip)
+
+@router.get("/search", response_model=List[schemas.BookResponse])
+async def search_books(
+    db: read_db_dependency,
+    q: str = Query(..., min_length=1),
+    skip: int = 0,
     limit: int = 10
 ):
-    return BookService.get_all(db, author, title, available_only, skip, limit)
+    return rows_response(schemas.BookResponse, await AsyncBookService.search(db, q, skip, limit))
+
+@router.get("/availability/stream")
+async def stream_books_availability(
+    db: read_db_dependency,
+    ids: List[int] = Query(..., min_length=1, max_length=MAX_STREAM_BOOKS)
+):
+    return await AsyncAvailabilityService.stream(db, sorted(set(ids)))
+
+@router.get("/{book_id}/availability/stream")
+async def stream_book_availability(book_id: int, db: read_db_dependency):
+    return await AsyncAvailabilityService.stream(db, [book_id])
 
 @router.get("/{book_id}", response_model=schemas.BookResponse)
-def get_book(book_id: int, db: db_dependency):
-    return BookService.get_one(db, book_id)
+async def get_book(book_id: int, request: Request, response: Response, db: read_db_dependency):
+    conditional = if_none_match(request)
+    if conditional:
+        etag = entity_etag("book", book_id, await AsyncBookService.get_version(db, book_id))
+        if etag_matches(conditional, etag):
+            return not_modified(etag)
+    book = await AsyncBookService.get_one(db, book_id)
+    response.headers["ETag"] = entity_etag("book", book_id, book["version"])
+    return book
 
 @router.patch("/{book_id}", response_model=schemas.BookResponse)
-def update_book(
+async def update_book(
     book_id: int,
     book_in: schemas.BookUpdate,
     db: db_dependency,
     current_user: user_dependency
 ):
-    return BookService.update(db, book_id, book_in)
+    return await AsyncBookService.update(db, book_id, book_in)
 
 @router.delete("/{book_id}")
-def delete_book(
+async def delete_book(
     book_id: int,
     db: db_dependency,
     current_user: user_dependency
 ):
-    return BookService.delete(db, book_id)
\ No newline at end of file
+    return await AsyncBookService.delete(db, book_id)
\ No newline at end of file
@@ -1,31 +1,120 @@
+from datetime import datetime
 from typing import List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request, Response
 
 from app import schemas
-from app.dependencies import db_dependency, user_dependency
-from app.services.borrow_service import BorrowService
+from app.dependencies import db_dependency, read_db_dependency, user_dependency
+from app.etags import etag_matches, if_none_match, list_etag, not_modified
+from app.idempotency import IdempotentRoute
+from app.pagination import set_next_cursor
+from app.serialization import rows_response
+from app.services.borrow_service import AsyncBorrowService
+from app.services.export_service import ExportService
+from app.services.overdue_service import AsyncOverdueService
 
-router = APIRouter(prefix="/borrows", tags=["Borrows"])
+router = APIRouter(prefix="/borrows", tags=["Borrows"], route_class=IdempotentRoute)
 
 
 @router.post("/", response_model=schemas.BorrowResponse)
-def borrow_book(
+async def borrow_book(
     borrow_in: schemas.BorrowCreate,
     db: db_dependency,
     current_user: user_dependency
 ):
-    return BorrowService.borrow_book(db, borrow_in)
+    return await AsyncBorrowService.borrow_book(db, borrow_in)
+
+@router.post("/batch", response_model=List[schemas.BorrowBatchResult])
+async def borrow_books_batch(
+    batch_in: schemas.BorrowBatchCreate,
+    db: db_dependency,
+    current_user: user_dependency
+):
+    return await AsyncBorrowService.borrow_batch(db, batch_in)
+
+@router.post("/return/batch", response_model=List[schemas.BorrowBatchResult])
+async def return_books_batch(
+    batch_in: schemas.BorrowBatchReturn,
+    db: db_dependency,
+    current_user: user_dependency
+):
+    return await AsyncBorrowService.return_batch(db, batch_in)
 
 @router.post("/{borrow_id}/return", response_model=schemas.BorrowResponse)
-def return_book(
+async def return_book(
     borrow_id: int,
     return_in: schemas.BorrowReturn,
     db: db_dependency,
     current_user: user_dependency
 ):
-    return BorrowService.return_book(db, borrow_id, return_in)
+    return await AsyncBorrowService.return_book(db, borrow_id, return_in)
+
+@router.get("/export")
+async def export_borrows(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    borrowed_from: datetime = None,
+    borrowed_to: datetime = None,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    gzip: bool = False
+):
+    stmt = ExportService.borrows_statement(borrowed_from, borrowed_to)
+    return ExportService.stream(db, stmt, "borrows", fmt, gzip)
+
+@router.get("/overdue", response_model=List[schemas.BorrowResponse])
+async def get_overdue_borrows(
+    response: Response,
+    db: read_db_dependency,
+    current_user: user_dependency,
+    as_of: datetime = None,
+    member_id: int = None,
+    book_id: int = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None
+):
+    records = await AsyncOverdueService.get_overdue(db, as_of, member_id, book_id, limit, cursor)
+    set_next_cursor(response, records, limit)
+    return rows_response(schemas.BorrowResponse, records, response)
+
+@router.get("/overdue/summary", response_model=List[schemas.OverdueSummaryEntry])
+async def get_overdue_summary(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    scope: str = Query("member", pattern="^(member|book)$"),
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=500)
+):
+    return await AsyncOverdueService.get_summary(db, scope, skip, limit)
+
+@router.post("/overdue/summary/refresh", response_model=schemas.OverdueSweepResult)
+async def refresh_overdue_summary(
+    db: db_dependency,
+    current_user: user_dependency,
+    as_of: datetime = None
+):
+    return await AsyncOverdueService.refresh_summary(db, as_of)
 
 @router.get("/members/{member_id}/borrows", response_model=List[schemas.BorrowResponse])
-def get_borrows_for_member(member_id: int, db: db_dependency):
-    return BorrowService.get_member_history(db, member_id)
\ No newline at end of file
+async def get_borrows_for_member(
+    member_id: int,
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
+    active_only: bool = None,
+    borrowed_from: datetime = None,
+    borrowed_to: datetime = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str = None
+):
+    filters = (active_only, borrowed_from, borrowed_to, order, skip, limit, cursor)
+    conditional = if_none_match(request)
+    if conditional:
+        etag = list_etag(await AsyncBorrowService.get_member_history_versions(db, member_id, *filters))
+        if etag_matches(conditional, etag):
+            return not_modified(etag)
+    records = await AsyncBorrowService.get_member_history(db, member_id, *filters)
+    response.headers["ETag"] = list_etag(records)
+    set_next_cursor(response, records, limit)
+    return rows_response(schemas.BorrowResponse, records, response)
\ No newline at end of file
@@ -1,34 +1,66 @@
 from typing import List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response, UploadFile
 
 from app import schemas
-from app.dependencies import db_dependency, user_dependency
-from app.services.member_service import MemberService
+from app.dependencies import db_dependency, read_db_dependency, user_dependency
+from app.etags import entity_etag, etag_matches, if_none_match, not_modified
+from app.idempotency import IdempotentRoute
+from app.pagination import set_next_cursor, set_total_count
+from app.serialization import rows_response
+from app.services.member_service import AsyncMemberService
+from app.services.import_service import AsyncImportService, detect_format
 
-router = APIRouter(prefix="/members", tags=["Members"])
+router = APIRouter(prefix="/members", tags=["Members"], route_class=IdempotentRoute)
 
 
 @router.post("/", response_model=schemas.MemberResponse)
-def create_member(
+async def create_member(
     member_in: schemas.MemberCreate,
     db: db_dependency,
     current_user: user_dependency
 ):
-    return MemberService.create(db, member_in)
+    return await AsyncMemberService.create(db, member_in)
+
+@router.post("/import", response_model=schemas.ImportReport)
+async def import_members(
+    file: UploadFile,
+    db: db_dependency,
+    current_user: user_dependency
+):
+    fmt = detect_format(file.filename, file.content_type)
+    return await AsyncImportService.import_members(db, file.file, fmt)
 
 @router.get("/", response_model=List[schemas.MemberResponse])
-def get_all_members(db: db_dependency, skip: int = 0, limit: int = 10):
-    return MemberService.get_all(db, skip, limit)
+async def get_all_members(
+    response: Response,
+    db: read_db_dependency,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str = None,
+    include_total: bool = False
+):
+    members = await AsyncMemberService.get_all(db, skip, limit, cursor)
+    set_next_cursor(response, members, limit)
+    if include_total:
+        set_total_count(response, *await AsyncMemberService.count(db))
+    return rows_response(schemas.MemberResponse, members, response)
 
 @router.get("/{member_id}", response_model=schemas.MemberResponse)
-def get_member(member_id: int, db: db_dependency):
-    return MemberService.get_one(db, member_id)
+async def get_member(member_id: int, request: Request, response: Response, db: read_db_dependency):
+    conditional = if_none_match(request)
+    if conditional:
+        etag = entity_etag("member", member_id, await AsyncMemberService.get_version(db, member_id))
+        if etag_matches(conditional, etag):
+            return not_modified(etag)
+    member = await AsyncMemberService.get_one(db, member_id)
+    response.headers["ETag"] = entity_etag("member", member_id, member["version"])
+    return member
 
 @router.delete("/{member_id}")
-def delete_member(
+async def delete_member(
     member_id: int,
     db: db_dependency,
     current_user: user_dependency
 ):
-    return MemberService.delete(db, member_id)
\ No newline at end of file
+    return await AsyncMemberService.delete(db, member_id)
\ No newline at end of file
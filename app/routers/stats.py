@@ -0,0 +1,48 @@
+from typing import List
+
+from fastapi import APIRouter, Query
+
+from app import schemas
+from app.dependencies import db_dependency, read_db_dependency, user_dependency
+from app.services.stats_service import AsyncStatsService
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get("/books/top", response_model=List[schemas.BookBorrowStat])
+async def get_most_borrowed_books(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    days: int = Query(30, ge=1, le=3660),
+    limit: int = Query(10, ge=1, le=100)
+):
+    return await AsyncStatsService.top_books(db, days, limit)
+
+@router.get("/books/utilization", response_model=List[schemas.BookUtilizationStat])
+async def get_book_utilization(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    limit: int = Query(10, ge=1, le=100)
+):
+    return await AsyncStatsService.utilization(db, limit)
+
+@router.get("/members/top", response_model=List[schemas.MemberBorrowStat])
+async def get_busiest_members(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    days: int = Query(30, ge=1, le=3660),
+    limit: int = Query(10, ge=1, le=100)
+):
+    return await AsyncStatsService.top_members(db, days, limit)
+
+@router.get("/borrows/daily", response_model=List[schemas.DailyCirculationStat])
+async def get_daily_circulation(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    days: int = Query(30, ge=1, le=3660)
+):
+    return await AsyncStatsService.daily(db, days)
+
+@router.post("/rebuild", response_model=schemas.StatsRebuildResult)
+async def rebuild_stats(db: db_dependency, current_user: user_dependency):
+    return await AsyncStatsService.rebuild(db)
@@ -1,10 +1,24 @@
 from .books import BookCreate, BookUpdate, BookResponse
 from .members import MemberCreate, MemberUpdate, MemberResponse
-from .borrows import BorrowCreate, BorrowReturn, BorrowResponse
+from .borrows import (
+    BorrowCreate, BorrowReturn, BorrowResponse,
+    BorrowBatchCreate, BorrowBatchReturn, BorrowBatchResult,
+    OverdueSummaryEntry, OverdueSweepResult
+)
 from .users import CreateUserRequest, Token
+from .imports import ImportRowError, ImportReport
+from .stats import (
+    BookBorrowStat, MemberBorrowStat, DailyCirculationStat,
+    BookUtilizationStat, StatsRebuildResult
+)
 __all__ = [
     "BookCreate", "BookUpdate", "BookResponse",
     "MemberCreate", "MemberUpdate", "MemberResponse",
     "BorrowCreate", "BorrowReturn", "BorrowResponse",
-    "CreateUserRequest", "Token"
+    "BorrowBatchCreate", "BorrowBatchReturn", "BorrowBatchResult",
+    "OverdueSummaryEntry", "OverdueSweepResult",
+    "CreateUserRequest", "Token",
+    "ImportRowError", "ImportReport",
+    "BookBorrowStat", "MemberBorrowStat", "DailyCirculationStat",
+    "BookUtilizationStat", "StatsRebuildResult"
 ]
\ No newline at end of file
@@ -23,5 +23,6 @@ class BookResponse(BookBase):
     id: int
     available_copies: int
     created_at: datetime
+    version: int
     model_config = ConfigDict(from_attributes=True)
 
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, ConfigDict, Field
-from datetime import datetime
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
 
 class BorrowBase(BaseModel):
     book_id: int = Field(..., example="550e8400-e29b-41d4-a716-446655440000")
@@ -12,9 +12,40 @@ class BorrowCreate(BorrowBase):
 class BorrowReturn(BaseModel):
     return_date: datetime = Field(default_factory=datetime.utcnow)
 
+    @field_validator("return_date")
+    @classmethod
+    def to_utc(cls, value: datetime) -> datetime:
+        # SQLite keeps only the wall time, so store UTC for the stats to bucket the same way on rebuild
+        return value.astimezone(timezone.utc) if value.tzinfo else value
+
 class BorrowResponse(BorrowBase):
     id: int
     borrowed_at: datetime
     due_date: datetime
     returned_at: Optional[datetime] = None 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class BorrowBatchCreate(BaseModel):
+    items: List[BorrowCreate] = Field(..., min_length=1, max_length=50)
+
+class BorrowBatchReturn(BorrowReturn):
+    borrow_ids: List[int] = Field(..., min_length=1, max_length=50)
+
+class BorrowBatchResult(BaseModel):
+    status_code: int
+    detail: Optional[str] = None
+    record: Optional[BorrowResponse] = None
+
+class OverdueSummaryEntry(BaseModel):
+    scope: Literal["member", "book"]
+    entity_id: int
+    overdue_count: int
+    oldest_due_date: datetime
+    refreshed_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+class OverdueSweepResult(BaseModel):
+    overdue_loans: int
+    members: int
+    books: int
+    refreshed_at: datetime
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    processed: int
+    inserted: int
+    failed: int
+    errors: List[ImportRowError]
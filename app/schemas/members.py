@@ -18,5 +18,7 @@ class MemberUpdate(BaseModel):
 class MemberResponse(MemberBase):
     id:int 
     created_at: datetime
+    active_borrow_count: int
+    version: int
     model_config = ConfigDict(from_attributes=True)
 
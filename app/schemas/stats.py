@@ -0,0 +1,37 @@
+from pydantic import BaseModel, ConfigDict, computed_field
+from datetime import date
+
+class BookBorrowStat(BaseModel):
+    book_id: int
+    title: str
+    author: str
+    borrows: int
+    model_config = ConfigDict(from_attributes=True)
+
+class MemberBorrowStat(BaseModel):
+    member_id: int
+    full_name: str
+    borrows: int
+    model_config = ConfigDict(from_attributes=True)
+
+class DailyCirculationStat(BaseModel):
+    day: date
+    borrows: int
+    returns: int
+    model_config = ConfigDict(from_attributes=True)
+
+class BookUtilizationStat(BaseModel):
+    book_id: int
+    title: str
+    total_copies: int
+    on_loan: int
+    model_config = ConfigDict(from_attributes=True)
+
+    @computed_field
+    @property
+    def utilization(self) -> float:
+        return self.on_loan / self.total_copies
+
+class StatsRebuildResult(BaseModel):
+    book_daily_stats: int
+    member_daily_stats: int
@@ -0,0 +1,31 @@
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+def response_columns(model, schema: type[BaseModel], *extra: str) -> list:
+    """Table columns for the fields of `schema` (plus `extra` ones), so a query returns response-shaped rows."""
+    columns = model.__table__.c
+    return [columns[name] for name in (*schema.model_fields, *extra)]
+
+
+class RowsJSONResponse(JSONResponse):
+    """Encodes plain dicts with pydantic-core's serializer, producing the same JSON as the response model."""
+
+    def render(self, content) -> bytes:
+        return to_json(content)
+
+
+def rows_response(schema: type[BaseModel], rows, response: Response | None = None) -> RowsJSONResponse:
+    """Serialize rows selected with response_columns(), skipping ORM hydration and model validation.
+
+    Returning a Response bypasses FastAPI's response_model handling (the declared model still
+    documents the endpoint), so headers set on the injected `response` are carried over here.
+    """
+    # response_columns() puts the schema fields first, so zip() drops any trailing extras
+    fields = tuple(schema.model_fields)
+    result = RowsJSONResponse([dict(zip(fields, row)) for row in rows])
+    if response is not None:
+        result.headers.raw.extend(response.headers.raw)
+    return result
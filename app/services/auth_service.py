@@ -1,28 +1,44 @@
 import os
+import time
 from datetime import datetime, timedelta
 
-from dotenv import load_dotenv
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 
+from app.cache import create_cache
+from app.database import run_sync_session
+from app.hashing import hash_password_sync, password_hasher, verify_and_update_sync
 from app.models.users import Users
 from app.schemas.users import CreateUserRequest
 
-load_dotenv()
-
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+
+# token -> username, so a repeated bearer token skips the signature check
+token_cache = create_cache("auth_tokens", AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+# username -> {"id", "username"}, so authentication skips the users lookup; on the configured
+# backend, so an update or delete on one worker evicts the entry for all of them
+user_cache = create_cache("auth_users", AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+
+@event.listens_for(Users, "after_update")
+@event.listens_for(Users, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    AuthService.invalidate_user(target.username)
+    for previous in inspect(target).attrs.username.history.deleted:
+        AuthService.invalidate_user(previous)
+
 
 class AuthService:
     @staticmethod
-    def create_user(db: Session, user_details: CreateUserRequest) -> dict:
+    def create_user(db: Session, user_details: CreateUserRequest, hashed_password: str | None = None) -> dict:
         existing_user = db.query(Users).filter(
             Users.username == user_details.username
         ).first()
@@ -32,7 +48,8 @@ class AuthService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already registered"
             )
-        hashed_password = bcrypt_context.hash(user_details.password)
+        if hashed_password is None:
+            hashed_password = hash_password_sync(user_details.password)
         new_user = Users(
             username=user_details.username,
             hashed_password=hashed_password
@@ -46,12 +63,26 @@ class AuthService:
     
     @staticmethod
     def authenticate_user(db: Session, username: str, password: str) -> Users | None:
-        user = db.query(Users).filter(Users.username == username).first()
+        user = AuthService.get_user_by_username(db, username)
         if not user:
             return None
-        if not bcrypt_context.verify(password, user.hashed_password):
+        valid, new_hash = verify_and_update_sync(password, user.hashed_password)
+        if not valid:
             return None
+        if new_hash:
+            AuthService.update_password_hash(db, user, new_hash)
         return user
+
+    @staticmethod
+    def get_user_by_username(db: Session, username: str) -> Users | None:
+        return db.query(Users).filter(Users.username == username).first()
+
+    @staticmethod
+    def update_password_hash(db: Session, user: Users, hashed_password: str) -> None:
+        # Transparent rehash when BCRYPT_ROUNDS changed since the password was stored
+        user.hashed_password = hashed_password
+        db.commit()
+        db.refresh(user)
     
     @staticmethod
     def create_access_token(
@@ -68,6 +99,8 @@ class AuthService:
             expire = datetime.now() + timedelta(minutes=15)
         
         to_encode.update({"exp": expire})
+        from jose import jwt
+
         return jwt.encode(to_encode, secret_key, algorithm=algorithm) 
     
     @staticmethod
@@ -98,19 +131,89 @@ class AuthService:
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username: str = payload.get("sub")
-            
-            if username is None:
-                raise credentials_exception
-                
-        except JWTError:
+        username = AuthService.token_subject(token)
+        if username is None:
             raise credentials_exception
-        
-        user = db.query(Users).filter(Users.username == username).first()
-        
-        if user is None:
-            raise credentials_exception
-        
+
+        cached = user_cache.get(username)
+        if cached is None:
+            user = db.query(Users.id, Users.username).filter(Users.username == username).first()
+
+            if user is None:
+                raise credentials_exception
+
+            cached = {"id": user.id, "username": user.username}
+            user_cache.set(username, cached)
+
+        # Transient, so the caller cannot lazy-load or flush through it; never carries the password hash
+        return Users(**cached)
+
+    @staticmethod
+    def token_subject(token: str) -> str | None:
+        """Return the username a valid token was issued to, or None for an invalid or expired token."""
+        username = token_cache.get(token)
+        if username is None:
+            # python-jose pulls in cryptography, so it loads with the first token rather than at startup
+            from jose import JWTError, jwt
+
+            try:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            except JWTError:
+                return None
+            username = payload.get("sub")
+            if username is None:
+                return None
+            # Never keep a token cached past its own expiry
+            expires_in = payload["exp"] - time.time() if "exp" in payload else None
+            token_cache.set(token, username, ttl=expires_in)
+        return username
+
+    @staticmethod
+    def invalidate_user(username: str) -> None:
+        user_cache.delete(username)
+
+
+class AsyncAuthService:
+    @staticmethod
+    async def create_user(db, user_details: CreateUserRequest) -> dict:
+        hashed_password = await password_hasher.hash(user_details.password)
+        return await run_sync_session(db, AuthService.create_user, user_details, hashed_password)
+
+    @staticmethod
+    async def authenticate_user(db, username: str, password: str) -> Users | None:
+        user = await run_sync_session(db, AuthService.get_user_by_username, username)
+        if not user:
+            return None
+        valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not valid:
+            return None
+        if new_hash:
+            await run_sync_session(db, AuthService.update_password_hash, user, new_hash)
         return user
+
+    @staticmethod
+    async def login_user(
+        db,
+        username: str,
+        password: str,
+        secret_key: str,
+        algorithm: str
+    ) -> dict:
+        user = await AsyncAuthService.authenticate_user(db, username, password)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid username or password"
+            )
+        access_token = AuthService.create_access_token(
+            data={"sub": user.username},
+            secret_key=secret_key,
+            algorithm=algorithm
+        )
+        return {"access_token": access_token, "token_type": "bearer"}
+
+    @staticmethod
+    async def get_current_user(token: str, db) -> Users:
+        return await run_sync_session(
+            db, lambda session: AuthService.get_current_user(token, session)
+        )
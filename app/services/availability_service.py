@@ -0,0 +1,85 @@
+import json
+import os
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from app import models
+from app.database import release_session, run_sync_session
+from app.pubsub import broker
+
+# Comment line sent when nothing changed, so proxies keep idle streams open
+SSE_KEEPALIVE = float(os.getenv("SSE_KEEPALIVE", "15"))
+# How long a disconnected EventSource waits before reconnecting, in milliseconds
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "5000"))
+MAX_STREAM_BOOKS = 100
+
+
+def _topic(book_id: int) -> str:
+    return f"book:{book_id}:availability"
+
+
+def publish_availability(book_id: int, available_copies: int, version: int) -> None:
+    """Announce a committed available_copies value to every stream watching the book.
+
+    Publishes from concurrent requests can arrive out of commit order; subscribers use the row
+    version to drop any that are older than what they already have.
+    """
+    broker.publish(_topic(book_id), {"book_id": book_id, "available_copies": available_copies, "version": version})
+
+
+def _event(message: dict) -> str:
+    return f"event: availability\ndata: {json.dumps(message)}\n\n"
+
+
+async def _stream(subscription, snapshot: list[dict]):
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        for message in snapshot:
+            yield _event(message)
+        while True:
+            messages = await subscription.get(SSE_KEEPALIVE)
+            if not messages:
+                yield ": keepalive\n\n"
+            for message in messages:
+                yield _event(message)
+    finally:
+        subscription.close()
+
+
+class AvailabilityService:
+    @staticmethod
+    def get_snapshot(db: Session, book_ids: list[int]) -> list[dict]:
+        Book = models.book.Book
+        rows = db.execute(
+            select(Book.id, Book.available_copies, Book.version).where(Book.id.in_(book_ids)).order_by(Book.id)
+        ).all()
+        return [
+            {"book_id": book_id, "available_copies": available, "version": version}
+            for book_id, available, version in rows
+        ]
+
+
+class AsyncAvailabilityService:
+    @staticmethod
+    async def stream(db, book_ids: list[int]) -> StreamingResponse:
+        # Subscribe before reading the snapshot so a change committed in between is not lost
+        subscription = broker.subscribe([_topic(book_id) for book_id in book_ids])
+        try:
+            snapshot = await run_sync_session(db, AvailabilityService.get_snapshot, book_ids)
+            # The stream can stay open for hours; it must not pin a pooled connection meanwhile
+            await release_session(db)
+        except BaseException:
+            subscription.close()
+            raise
+        if not snapshot:
+            subscription.close()
+            raise HTTPException(status_code=404, detail="Book not found")
+        for message in snapshot:
+            subscription.skip_to(_topic(message["book_id"]), message["version"])
+        return StreamingResponse(
+            _stream(subscription, snapshot),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
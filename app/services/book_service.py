@@ -1,6 +1,22 @@
+import os
+
+from sqlalchemy import func, literal_column, or_, table, column
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app import models, schemas
+from app.cache import create_cache
+from app.database import run_sync_session
+from app.pagination import decode_cursor
+from app.serialization import response_columns
+from app.services.availability_service import publish_availability
+from app.services.count_service import CountService
+
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", "30"))
+
+# book id -> serialized BookResponse, invalidated whenever the row or its availability changes
+book_cache = create_cache("books", ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL)
+
 
 class BookService:
     @staticmethod
@@ -11,20 +27,78 @@ class BookService:
             available_copies=book_in.total_copies 
         )
         db.add(db_book)
+        db.flush()
+        CountService.adjust(db, models.book.Book, 1)
         db.commit()
         db.refresh(db_book)
         return db_book
 
     @staticmethod
-    def get_all(db: Session, author: str = None, title: str = None, available_only: bool = None, skip: int = 0, limit: int = 10):
-        query = db.query(models.book.Book)
+    def get_all(db: Session, author: str = None, title: str = None, available_only: bool = None, skip: int = 0, limit: int = 10, cursor: str = None):
+        query = db.query(*response_columns(models.book.Book, schemas.BookResponse))
+        return BookService._page(query, author, title, available_only, skip, limit, cursor).all()
+
+    @staticmethod
+    def get_all_versions(db: Session, author: str = None, title: str = None, available_only: bool = None, skip: int = 0, limit: int = 10, cursor: str = None):
+        # Same page as get_all, but only (id, version) so a conditional GET can skip loading rows
+        query = db.query(models.book.Book.id, models.book.Book.version)
+        return BookService._page(query, author, title, available_only, skip, limit, cursor).all()
+
+    @staticmethod
+    def count(db: Session, author: str = None, title: str = None, available_only: bool = None) -> tuple[int, bool]:
+        if not (author or title or available_only):
+            return CountService.total(db, models.book.Book), True
+        query = BookService._filter(db.query(models.book.Book.id), author, title, available_only)
+        return CountService.count(db, models.book.Book, query.statement)
+
+    @staticmethod
+    def _filter(query, author: str = None, title: str = None, available_only: bool = None):
         if author:
             query = query.filter(models.book.Book.author.ilike(f"%{author}%"))
         if title:
             query = query.filter(models.book.Book.title.ilike(f"%{title}%"))
         if available_only:
             query = query.filter(models.book.Book.available_copies > 0)
-        return query.offset(skip).limit(limit).all()
+        return query
+
+    @staticmethod
+    def _page(query, author: str = None, title: str = None, available_only: bool = None, skip: int = 0, limit: int = 10, cursor: str = None):
+        query = BookService._filter(query, author, title, available_only).order_by(models.book.Book.id)
+        if cursor:
+            # Keyset pagination: seek past the last seen id instead of scanning skipped rows
+            query = query.filter(models.book.Book.id > decode_cursor(cursor))
+        else:
+            query = query.offset(skip)
+        return query.limit(limit)
+
+    @staticmethod
+    def search(db: Session, q: str, skip: int = 0, limit: int = 10):
+        Book = models.book.Book
+        columns = response_columns(Book, schemas.BookResponse)
+        if db.get_bind().dialect.name == "postgresql":
+            # Literals (not bind params) so the planner matches the ix_books_search_tsv expression
+            document = func.to_tsvector(
+                literal_column("'simple'"), Book.title + literal_column("' '") + Book.author
+            )
+            ts_query = func.plainto_tsquery("simple", q)
+            rank = func.ts_rank(document, ts_query) + func.greatest(
+                func.similarity(Book.title, q), func.similarity(Book.author, q)
+            )
+            query = db.query(*columns).filter(
+                or_(document.op("@@")(ts_query), Book.title.op("%")(q), Book.author.op("%")(q))
+            )
+        else:
+            # Quote each term so FTS5 syntax in user input is matched literally, then prefix-match it
+            terms = [term.replace('"', "") for term in q.split()]
+            match = " ".join(f'"{term}"*' for term in terms if term)
+            if not match:
+                return []
+            books_fts = table("books_fts", column("rowid"))
+            rank = -func.bm25(literal_column("books_fts"))
+            query = db.query(*columns).join(books_fts, books_fts.c.rowid == Book.id).filter(
+                literal_column("books_fts").op("MATCH")(match)
+            )
+        return query.order_by(rank.desc(), Book.id).offset(skip).limit(limit).all()
 
     @staticmethod
     def get_one(db: Session, book_id: int):
@@ -33,6 +107,13 @@ class BookService:
             raise HTTPException(status_code=404, detail="Book not found")
         return db_book
 
+    @staticmethod
+    def get_version(db: Session, book_id: int) -> int:
+        version = db.query(models.book.Book.version).filter(models.book.Book.id == book_id).scalar()
+        if version is None:
+            raise HTTPException(status_code=404, detail="Book not found")
+        return version
+
     @staticmethod
     def update(db: Session, book_id: int, book_in: schemas.BookUpdate):
         db_book = db.query(models.book.Book).filter(models.book.Book.id == book_id).first()
@@ -57,7 +138,10 @@ class BookService:
                 setattr(db_book, key, value)
 
         db.commit()
+        book_cache.delete(book_id)
         db.refresh(db_book)
+        if "total_copies" in update_data:
+            publish_availability(book_id, db_book.available_copies, db_book.version)
         return db_book
 
     @staticmethod
@@ -67,5 +151,56 @@ class BookService:
             raise HTTPException(status_code=404, detail="Book not found")
         
         db.delete(db_book)
+        db.flush()
+        CountService.adjust(db, models.book.Book, -1)
         db.commit()
-        return {"message": f"Book with id {book_id} has been deleted successfully"}
\ No newline at end of file
+        book_cache.delete(book_id)
+        return {"message": f"Book with id {book_id} has been deleted successfully"}
+
+
+class AsyncBookService:
+    @staticmethod
+    async def create(db, book_in: schemas.BookCreate):
+        return await run_sync_session(db, BookService.create, book_in)
+
+    @staticmethod
+    async def get_all(db, author: str = None, title: str = None, available_only: bool = None, skip: int = 0, limit: int = 10, cursor: str = None):
+        return await run_sync_session(db, BookService.get_all, author, title, available_only, skip, limit, cursor)
+
+    @staticmethod
+    async def get_all_versions(db, author: str = None, title: str = None, available_only: bool = None, skip: int = 0, limit: int = 10, cursor: str = None):
+        return await run_sync_session(db, BookService.get_all_versions, author, title, available_only, skip, limit, cursor)
+
+    @staticmethod
+    async def count(db, author: str = None, title: str = None, available_only: bool = None) -> tuple[int, bool]:
+        return await run_sync_session(db, BookService.count, author, title, available_only)
+
+    @staticmethod
+    async def search(db, q: str, skip: int = 0, limit: int = 10):
+        return await run_sync_session(db, BookService.search, q, skip, limit)
+
+    @staticmethod
+    async def get_one(db, book_id: int):
+        # Read-through: a hit is served without touching the session or the threadpool
+        cached = book_cache.get(book_id)
+        if cached is not None:
+            return cached
+        db_book = await run_sync_session(db, BookService.get_one, book_id)
+        book = schemas.BookResponse.model_validate(db_book).model_dump(mode="json")
+        book_cache.set(book_id, book)
+        return book
+
+    @staticmethod
+    async def get_version(db, book_id: int) -> int:
+        cached = book_cache.get(book_id)
+        if cached is not None:
+            return cached["version"]
+        return await run_sync_session(db, BookService.get_version, book_id)
+
+    @staticmethod
+    async def update(db, book_id: int, book_in: schemas.BookUpdate):
+        return await run_sync_session(db, BookService.update, book_id, book_in)
+
+    @staticmethod
+    async def delete(db, book_id: int):
+        return await run_sync_session(db, BookService.delete, book_id)
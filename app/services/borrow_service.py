@@ -1,57 +1,314 @@
+from sqlalchemy import and_, bindparam, insert, or_, select, update
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from datetime import datetime, timedelta
 from app import models, schemas
+from app.database import run_sync_session
+from app.pagination import decode_cursor
+from app.serialization import response_columns
+from app.services.availability_service import publish_availability
+from app.services.book_service import book_cache
+from app.services.member_service import member_cache
+from app.services.stats_service import StatsService
+
+MAX_ACTIVE_BORROWS = 3
+
+
+def _apply_deltas(db: Session, model, column: str, deltas: dict) -> None:
+    """Add per-row deltas to a counter column with one executemany UPDATE."""
+    if not deltas:
+        return
+    table = model.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values({column: table.c[column] + bindparam("delta")}),
+        [{"row_id": row_id, "delta": delta} for row_id, delta in sorted(deltas.items())]
+    )
+
 
 class BorrowService:
     @staticmethod
     def borrow_book(db: Session, borrow_in: schemas.BorrowCreate):
-        db_book = db.query(models.book.Book).filter(models.book.Book.id == borrow_in.book_id).first()
-        if not db_book or db_book.available_copies < 1:
+        Book = models.book.Book
+        Member = models.member.Member
+        BorrowRecord = models.borrow.BorrowRecord
+
+        # Decrement only while a copy is left; the row lock taken by the UPDATE makes
+        # concurrent borrows of the last copy queue up instead of both succeeding.
+        available = db.execute(
+            update(Book)
+            .where(Book.id == borrow_in.book_id, Book.available_copies > 0)
+            .values(available_copies=Book.available_copies - 1)
+            .returning(Book.available_copies, Book.version)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if available is None:
+            db.rollback()
             raise HTTPException(status_code=409, detail="The book is not available for borrowing")
 
-        db_member = db.query(models.member.Member).filter(models.member.Member.id == borrow_in.member_id).first()
-        if not db_member:
-            raise HTTPException(status_code=404, detail="Member not found")
-        
-        # Check borrow limit (max 3 active borrows per member)
-        active_borrows = db.query(models.borrow.BorrowRecord).filter(
-            models.borrow.BorrowRecord.member_id == borrow_in.member_id,
-            models.borrow.BorrowRecord.returned_at == None
-        ).count()
-        if active_borrows >= 3:
+        # Check borrow limit (max 3 active borrows per member) as a single-row conditional update;
+        # its row lock serializes concurrent borrows by the same member.
+        counted = db.execute(
+            update(Member)
+            .where(Member.id == borrow_in.member_id, Member.active_borrow_count < MAX_ACTIVE_BORROWS)
+            .values(active_borrow_count=Member.active_borrow_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if counted.rowcount == 0:
+            db_member_id = db.execute(select(Member.id).where(Member.id == borrow_in.member_id)).scalar()
+            db.rollback()
+            if db_member_id is None:
+                raise HTTPException(status_code=404, detail="Member not found")
             raise HTTPException(status_code=400, detail="Member has reached the maximum borrow limit of 3 books")
-        
-        db_book.available_copies -= 1
+
         due_date = datetime.now() + timedelta(days=14)
-        new_record = models.borrow.BorrowRecord(
-            **borrow_in.model_dump(),
-            due_date=due_date
-        )
-        
-        db.add(new_record)
+        new_record = db.scalars(
+            insert(BorrowRecord)
+            .values(**borrow_in.model_dump(), due_date=due_date)
+            .returning(BorrowRecord)
+        ).one()
+        StatsService.record(db, new_record.borrowed_at, [(new_record.book_id, new_record.member_id)], "borrows")
+
+        # RETURNING already loaded every column; detach so commit does not expire it into a re-SELECT
+        db.expunge(new_record)
         db.commit()
-        db.refresh(new_record)
+        book_cache.delete(borrow_in.book_id)
+        member_cache.delete(borrow_in.member_id)
+        publish_availability(borrow_in.book_id, *available)
         return new_record
 
     @staticmethod
     def return_book(db: Session, borrow_id: int, return_in: schemas.BorrowReturn):
-        db_borrow = db.query(models.borrow.BorrowRecord).filter(models.borrow.BorrowRecord.id == borrow_id).first()
-        if not db_borrow:
-            raise HTTPException(status_code=404, detail="Borrow record not found")
-        
-        if db_borrow.returned_at:
+        BorrowRecord = models.borrow.BorrowRecord
+        Book = models.book.Book
+        Member = models.member.Member
+
+        # Only an unreturned record can be closed, so a retried return cannot release a copy twice
+        db_borrow = db.scalars(
+            update(BorrowRecord)
+            .where(BorrowRecord.id == borrow_id, BorrowRecord.returned_at == None)
+            .values(returned_at=return_in.return_date)
+            .returning(BorrowRecord)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if db_borrow is None:
+            exists = db.execute(select(BorrowRecord.id).where(BorrowRecord.id == borrow_id)).scalar()
+            db.rollback()
+            if exists is None:
+                raise HTTPException(status_code=404, detail="Borrow record not found")
             raise HTTPException(status_code=409, detail="Book has already been returned")
 
-        db_borrow.returned_at = return_in.return_date
-        db_book = db.query(models.book.Book).filter(models.book.Book.id == db_borrow.book_id).first()
-        if not db_book:  
-            raise HTTPException(status_code=404, detail="Book not found")  
-        db_book.available_copies += 1
+        available = db.execute(
+            update(Book)
+            .where(Book.id == db_borrow.book_id)
+            .values(available_copies=Book.available_copies + 1)
+            .returning(Book.available_copies, Book.version)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if available is None:
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Book not found")
+        db.execute(
+            update(Member)
+            .where(Member.id == db_borrow.member_id)
+            .values(active_borrow_count=Member.active_borrow_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        StatsService.record(db, db_borrow.returned_at, [(db_borrow.book_id, db_borrow.member_id)], "returns")
+        db.expunge(db_borrow)
         db.commit()
-        db.refresh(db_borrow)
+        book_cache.delete(db_borrow.book_id)
+        member_cache.delete(db_borrow.member_id)
+        publish_availability(db_borrow.book_id, *available)
         return db_borrow
 
     @staticmethod
-    def get_member_history(db: Session, member_id: int):
-        return db.query(models.borrow.BorrowRecord).filter(models.borrow.BorrowRecord.member_id == member_id).all()
\ No newline at end of file
+    def borrow_batch(db: Session, batch_in: schemas.BorrowBatchCreate):
+        Book = models.book.Book
+        Member = models.member.Member
+        BorrowRecord = models.borrow.BorrowRecord
+        book_ids = sorted({item.book_id for item in batch_in.items})
+        member_ids = sorted({item.member_id for item in batch_in.items})
+
+        # Same lock order as borrow_book (books, then members) so batches cannot deadlock single borrows
+        available, versions = {}, {}
+        for book_id, copies, version in db.execute(
+            select(Book.id, Book.available_copies, Book.version)
+            .where(Book.id.in_(book_ids)).order_by(Book.id).with_for_update()
+        ):
+            available[book_id], versions[book_id] = copies, version
+        active = dict(db.execute(
+            select(Member.id, Member.active_borrow_count)
+            .where(Member.id.in_(member_ids)).order_by(Member.id).with_for_update()
+        ).all())
+
+        results = []
+        accepted = []
+        for item in batch_in.items:
+            if available.get(item.book_id, 0) < 1:
+                results.append({"status_code": 409, "detail": "The book is not available for borrowing"})
+            elif item.member_id not in active:
+                results.append({"status_code": 404, "detail": "Member not found"})
+            elif active.get(item.member_id, 0) >= MAX_ACTIVE_BORROWS:
+                results.append({"status_code": 400, "detail": "Member has reached the maximum borrow limit of 3 books"})
+            else:
+                available[item.book_id] -= 1
+                active[item.member_id] += 1
+                results.append({"status_code": 200})
+                accepted.append((len(results) - 1, item))
+
+        if accepted:
+            taken, opened = {}, {}
+            for _, item in accepted:
+                taken[item.book_id] = taken.get(item.book_id, 0) - 1
+                opened[item.member_id] = opened.get(item.member_id, 0) + 1
+            _apply_deltas(db, Book, "available_copies", taken)
+            _apply_deltas(db, Member, "active_borrow_count", opened)
+            due_date = datetime.now() + timedelta(days=14)
+            records = db.scalars(
+                insert(BorrowRecord).returning(BorrowRecord, sort_by_parameter_order=True),
+                [{**item.model_dump(), "due_date": due_date} for _, item in accepted]
+            ).all()
+            StatsService.record(
+                db, records[0].borrowed_at, [(record.book_id, record.member_id) for record in records], "borrows"
+            )
+            for (index, _), record in zip(accepted, records):
+                results[index]["record"] = record
+                db.expunge(record)
+        db.commit()
+        for _, item in accepted:
+            book_cache.delete(item.book_id)
+            member_cache.delete(item.member_id)
+        # Each locked book got exactly one UPDATE, which bumped its version once
+        for book_id in sorted({item.book_id for _, item in accepted}):
+            publish_availability(book_id, available[book_id], versions[book_id] + 1)
+        return results
+
+    @staticmethod
+    def return_batch(db: Session, batch_in: schemas.BorrowBatchReturn):
+        BorrowRecord = models.borrow.BorrowRecord
+        Book = models.book.Book
+        Member = models.member.Member
+        borrow_ids = set(batch_in.borrow_ids)
+
+        closed = {
+            record.id: record
+            for record in db.scalars(
+                update(BorrowRecord)
+                .where(BorrowRecord.id.in_(borrow_ids), BorrowRecord.returned_at == None)
+                .values(returned_at=batch_in.return_date)
+                .returning(BorrowRecord)
+                .execution_options(synchronize_session=False)
+            )
+        }
+        known = set(closed)
+        if len(closed) < len(borrow_ids):
+            known |= set(db.execute(
+                select(BorrowRecord.id).where(BorrowRecord.id.in_(borrow_ids - set(closed)))
+            ).scalars())
+
+        released, closed_for = {}, {}
+        for record in closed.values():
+            released[record.book_id] = released.get(record.book_id, 0) + 1
+            closed_for[record.member_id] = closed_for.get(record.member_id, 0) - 1
+        _apply_deltas(db, Book, "available_copies", released)
+        _apply_deltas(db, Member, "active_borrow_count", closed_for)
+        # The executemany UPDATE cannot return rows, so read the new counts back inside the transaction
+        available = db.execute(
+            select(Book.id, Book.available_copies, Book.version).where(Book.id.in_(released))
+        ).all() if released else []
+        StatsService.record(
+            db, batch_in.return_date, [(record.book_id, record.member_id) for record in closed.values()], "returns"
+        )
+
+        results = []
+        for borrow_id in batch_in.borrow_ids:
+            record = closed.pop(borrow_id, None)
+            if record is not None:
+                db.expunge(record)
+                results.append({"status_code": 200, "record": record})
+            elif borrow_id in known:
+                results.append({"status_code": 409, "detail": "Book has already been returned"})
+            else:
+                results.append({"status_code": 404, "detail": "Borrow record not found"})
+        db.commit()
+        for book_id in released:
+            book_cache.delete(book_id)
+        for member_id in closed_for:
+            member_cache.delete(member_id)
+        for book_id, copies, version in available:
+            publish_availability(book_id, copies, version)
+        return results
+
+    @staticmethod
+    def get_member_history(db: Session, member_id: int, active_only: bool = None, borrowed_from: datetime = None, borrowed_to: datetime = None, order: str = "asc", skip: int = 0, limit: int = 50, cursor: str = None):
+        query = db.query(*response_columns(models.borrow.BorrowRecord, schemas.BorrowResponse, "version"))
+        return BorrowService._history_page(query, member_id, active_only, borrowed_from, borrowed_to, order, skip, limit, cursor).all()
+
+    @staticmethod
+    def get_member_history_versions(db: Session, member_id: int, active_only: bool = None, borrowed_from: datetime = None, borrowed_to: datetime = None, order: str = "asc", skip: int = 0, limit: int = 50, cursor: str = None):
+        BorrowRecord = models.borrow.BorrowRecord
+        query = db.query(BorrowRecord.id, BorrowRecord.version)
+        return BorrowService._history_page(query, member_id, active_only, borrowed_from, borrowed_to, order, skip, limit, cursor).all()
+
+    @staticmethod
+    def _history_page(query, member_id: int, active_only: bool = None, borrowed_from: datetime = None, borrowed_to: datetime = None, order: str = "asc", skip: int = 0, limit: int = 50, cursor: str = None):
+        BorrowRecord = models.borrow.BorrowRecord
+        # Every branch keeps member_id as the leading equality so ix_borrow_records_member_* apply
+        query = query.filter(BorrowRecord.member_id == member_id)
+        if active_only:
+            query = query.filter(BorrowRecord.returned_at == None)
+        if borrowed_from:
+            query = query.filter(BorrowRecord.borrowed_at >= borrowed_from)
+        if borrowed_to:
+            query = query.filter(BorrowRecord.borrowed_at < borrowed_to)
+
+        descending = order == "desc"
+        if descending:
+            query = query.order_by(BorrowRecord.borrowed_at.desc(), BorrowRecord.id.desc())
+        else:
+            query = query.order_by(BorrowRecord.borrowed_at, BorrowRecord.id)
+        if cursor:
+            # Seek past the cursor row on (borrowed_at, id) without scanning the skipped history
+            last_id = decode_cursor(cursor)
+            last_borrowed_at = select(BorrowRecord.borrowed_at).where(BorrowRecord.id == last_id).scalar_subquery()
+            if descending:
+                query = query.filter(or_(
+                    BorrowRecord.borrowed_at < last_borrowed_at,
+                    and_(BorrowRecord.borrowed_at == last_borrowed_at, BorrowRecord.id < last_id),
+                ))
+            else:
+                query = query.filter(or_(
+                    BorrowRecord.borrowed_at > last_borrowed_at,
+                    and_(BorrowRecord.borrowed_at == last_borrowed_at, BorrowRecord.id > last_id),
+                ))
+        else:
+            query = query.offset(skip)
+        return query.limit(limit)
+
+
+class AsyncBorrowService:
+    @staticmethod
+    async def borrow_book(db, borrow_in: schemas.BorrowCreate):
+        return await run_sync_session(db, BorrowService.borrow_book, borrow_in)
+
+    @staticmethod
+    async def return_book(db, borrow_id: int, return_in: schemas.BorrowReturn):
+        return await run_sync_session(db, BorrowService.return_book, borrow_id, return_in)
+
+    @staticmethod
+    async def borrow_batch(db, batch_in: schemas.BorrowBatchCreate):
+        return await run_sync_session(db, BorrowService.borrow_batch, batch_in)
+
+    @staticmethod
+    async def return_batch(db, batch_in: schemas.BorrowBatchReturn):
+        return await run_sync_session(db, BorrowService.return_batch, batch_in)
+
+    @staticmethod
+    async def get_member_history(db, member_id: int, active_only: bool = None, borrowed_from: datetime = None, borrowed_to: datetime = None, order: str = "asc", skip: int = 0, limit: int = 50, cursor: str = None):
+        return await run_sync_session(db, BorrowService.get_member_history, member_id, active_only, borrowed_from, borrowed_to, order, skip, limit, cursor)
+
+    @staticmethod
+    async def get_member_history_versions(db, member_id: int, active_only: bool = None, borrowed_from: datetime = None, borrowed_to: datetime = None, order: str = "asc", skip: int = 0, limit: int = 50, cursor: str = None):
+        return await run_sync_session(db, BorrowService.get_member_history_versions, member_id, active_only, borrowed_from, borrowed_to, order, skip, limit, cursor)
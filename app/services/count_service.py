@@ -0,0 +1,100 @@
+import json
+import os
+
+from sqlalchemy import delete, func, insert, literal, select, union_all, update
+from sqlalchemy.orm import Session
+from app import models
+from app.services.stats_service import upsert
+
+# Filtered totals up to this size are counted exactly; larger ones are estimated
+COUNT_EXACT_LIMIT = int(os.getenv("COUNT_EXACT_LIMIT", "1000"))
+# Rows inspected to extrapolate a filtered total where no planner estimate is available
+COUNT_SAMPLE_SIZE = int(os.getenv("COUNT_SAMPLE_SIZE", "10000"))
+
+
+def _counted_tables():
+    return [models.book.Book.__table__, models.member.Member.__table__]
+
+
+def _planner_estimate(db: Session, stmt) -> int:
+    compiled = stmt.compile(dialect=db.get_bind().dialect)
+    parameters = compiled.construct_params()
+    if compiled.positional:
+        parameters = tuple(parameters[name] for name in compiled.positiontup)
+    plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _sampled_estimate(db: Session, model, stmt, total: int) -> int:
+    # The sample is the lowest ids, so this assumes matches are spread evenly across the table
+    sample = select(model.id).order_by(model.id).limit(COUNT_SAMPLE_SIZE).scalar_subquery()
+    matched = db.execute(
+        select(func.count()).select_from(stmt.where(model.id.in_(sample)).subquery())
+    ).scalar()
+    return round(matched / min(COUNT_SAMPLE_SIZE, total) * total) if total else 0
+
+
+class CountService:
+    @staticmethod
+    def adjust(db: Session, model, delta: int) -> None:
+        """Apply a row-count change inside the caller's transaction, after its rows are flushed."""
+        RowCount = models.counts.RowCount
+        table = model.__tablename__
+        updated = db.execute(
+            update(RowCount)
+            .where(RowCount.table_name == table)
+            .values(row_count=RowCount.row_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+        if updated.rowcount == 0:
+            # First write since the counter was created: seed it from the table, which already holds the
+            # caller's flushed rows. A concurrent first writer that seeded it meanwhile wins the insert,
+            # and this transaction's rows are then added on top instead of failing on the primary key.
+            stmt = upsert(db, RowCount).values(
+                table_name=table, row_count=select(func.count()).select_from(model).scalar_subquery()
+            )
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["table_name"], set_={"row_count": RowCount.row_count + delta}
+            ))
+
+    @staticmethod
+    def total(db: Session, model) -> int:
+        RowCount = models.counts.RowCount
+        total = db.execute(
+            select(RowCount.row_count).where(RowCount.table_name == model.__tablename__)
+        ).scalar()
+        if total is None:
+            total = db.execute(select(func.count()).select_from(model)).scalar()
+        return total
+
+    @staticmethod
+    def count(db: Session, model, stmt) -> tuple[int, bool]:
+        """Count the rows `stmt` selects: exactly when small, otherwise an estimate flagged as inexact."""
+        capped = db.execute(
+            select(func.count()).select_from(stmt.limit(COUNT_EXACT_LIMIT + 1).subquery())
+        ).scalar()
+        if capped <= COUNT_EXACT_LIMIT:
+            return capped, True
+        if db.get_bind().dialect.name == "postgresql":
+            estimate = _planner_estimate(db, stmt)
+        else:
+            estimate = _sampled_estimate(db, model, stmt, CountService.total(db, model))
+        # Known to exceed the cap, so never report less than it
+        return max(estimate, capped), False
+
+    @staticmethod
+    def refresh(db) -> dict:
+        """Recount every counted table; works on a Session or a Connection and leaves committing to the caller."""
+        RowCount = models.counts.RowCount
+        tables = _counted_tables()
+        db.execute(delete(RowCount).where(RowCount.table_name.in_([table.name for table in tables])))
+        db.execute(insert(RowCount).from_select(
+            ["table_name", "row_count"],
+            union_all(*[
+                select(literal(table.name), select(func.count()).select_from(table).scalar_subquery())
+                for table in tables
+            ])
+        ))
+        return dict(db.execute(select(RowCount.table_name, RowCount.row_count)).all())
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import date, datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from app import models
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class _Encoder:
+    """Turns batches of rows into NDJSON or CSV bytes, optionally as one continuous gzip stream."""
+
+    def __init__(self, fmt: str, columns: list[str], compress: bool):
+        self.fmt = fmt
+        self.columns = columns
+        # wbits=31 selects the gzip container so the output is a valid .gz stream
+        self._compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def _emit(self, data: str) -> bytes:
+        raw = data.encode()
+        return self._compressor.compress(raw) if self._compressor else raw
+
+    def start(self) -> bytes:
+        if self.fmt == "csv":
+            return self._emit(",".join(self.columns) + "\r\n")
+        return b""
+
+    def encode(self, rows) -> bytes:
+        if self.fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(
+                [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+                for row in rows
+            )
+            return self._emit(buffer.getvalue())
+        return self._emit("".join(
+            json.dumps(dict(zip(self.columns, row)), default=_json_default) + "\n" for row in rows
+        ))
+
+    def finish(self) -> bytes:
+        return self._compressor.flush() if self._compressor else b""
+
+
+def _stream_sync(db: Session, stmt, encoder: _Encoder):
+    yield encoder.start()
+    # yield_per turns on server-side cursors (stream_results) so memory stays at one batch
+    result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield encoder.encode(partition)
+    yield encoder.finish()
+
+
+async def _stream_async(db: AsyncSession, stmt, encoder: _Encoder):
+    yield encoder.start()
+    result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    async for partition in result.partitions():
+        yield encoder.encode(partition)
+    yield encoder.finish()
+
+
+class ExportService:
+    @staticmethod
+    def books_statement(available_only: bool = None):
+        Book = models.book.Book
+        stmt = select(
+            Book.id, Book.title, Book.author, Book.isbn,
+            Book.total_copies, Book.available_copies, Book.created_at
+        ).order_by(Book.id)
+        if available_only:
+            stmt = stmt.where(Book.available_copies > 0)
+        return stmt
+
+    @staticmethod
+    def borrows_statement(borrowed_from: datetime = None, borrowed_to: datetime = None):
+        BorrowRecord = models.borrow.BorrowRecord
+        stmt = select(
+            BorrowRecord.id, BorrowRecord.book_id, BorrowRecord.member_id,
+            BorrowRecord.borrowed_at, BorrowRecord.due_date, BorrowRecord.returned_at
+        ).order_by(BorrowRecord.id)
+        if borrowed_from:
+            stmt = stmt.where(BorrowRecord.borrowed_at >= borrowed_from)
+        if borrowed_to:
+            stmt = stmt.where(BorrowRecord.borrowed_at < borrowed_to)
+        return stmt
+
+    @staticmethod
+    def stream(db, stmt, name: str, fmt: str = "ndjson", compress: bool = False) -> StreamingResponse:
+        columns = [column.name for column in stmt.selected_columns]
+        encoder = _Encoder(fmt, columns, compress)
+        if isinstance(db, AsyncSession):
+            body = _stream_async(db, stmt, encoder)
+        else:
+            body = _stream_sync(db, stmt, encoder)
+        headers = {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+        if compress:
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=headers)
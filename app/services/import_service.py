@@ -0,0 +1,197 @@
+import csv
+import io
+import json
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from app import models, schemas
+from app.database import run_sync_session
+from app.services.count_service import CountService
+
+IMPORT_CHUNK_SIZE = 1000
+
+CSV_CONTENT_TYPES = {"text/csv", "application/csv"}
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+
+def detect_format(filename: str | None, content_type: str | None) -> str:
+    name = (filename or "").lower()
+    if content_type in CSV_CONTENT_TYPES or name.endswith(".csv"):
+        return "csv"
+    if content_type in NDJSON_CONTENT_TYPES or name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    raise HTTPException(status_code=415, detail="Import file must be CSV or NDJSON")
+
+
+def _iter_records(fileobj, fmt: str):
+    """Yield (line, record) pairs; record is an error message when the line cannot be parsed."""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield line_no, "Invalid JSON"
+                    continue
+                yield line_no, record if isinstance(record, dict) else "Expected a JSON object"
+    finally:
+        text.detach()
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+
+def _copy_insert(db: Session, model, key: str, rows: list[dict]) -> set:
+    """Bulk load through COPY into a staging table, then merge with ON CONFLICT DO NOTHING."""
+    table = model.__table__.name
+    columns = list(rows[0].keys())
+    column_list = ", ".join(columns)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([[row[column] for column in columns] for row in rows])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE {table}_import ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {table} WITH NO DATA"
+        )
+        cursor.copy_expert(f"COPY {table}_import ({column_list}) FROM STDIN WITH CSV", buffer)
+        cursor.execute(
+            f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {table}_import "
+            f"ON CONFLICT DO NOTHING RETURNING {key}"
+        )
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def _bulk_insert(db: Session, model, key: str, rows: list[dict]) -> set:
+    """Insert rows in one statement, skipping unique conflicts, and return the inserted keys."""
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql":
+        if dialect.driver == "psycopg2":
+            return _copy_insert(db, model, key, rows)
+        stmt = postgresql.insert(model).on_conflict_do_nothing()
+    elif dialect.name == "sqlite":
+        stmt = sqlite.insert(model).on_conflict_do_nothing()
+    else:
+        stmt = insert(model)
+    result = db.execute(stmt.returning(getattr(model, key)), rows)
+    return set(result.scalars().all())
+
+
+def _parse(fileobj, fmt: str, schema, to_row, report: dict):
+    """Yield validated rows in chunks of IMPORT_CHUNK_SIZE, recording lines that fail in the report."""
+    chunk = []
+    for line, record in _iter_records(fileobj, fmt):
+        report["processed"] += 1
+        if isinstance(record, str):
+            report["errors"].append({"line": line, "error": record})
+            continue
+        try:
+            item = schema.model_validate(record)
+        except ValidationError as exc:
+            report["errors"].append({"line": line, "error": _format_validation_error(exc)})
+            continue
+        chunk.append((line, to_row(item)))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _write(db: Session, chunk: list, model, key: str, conflict_detail: str, report: dict) -> None:
+    # Keep the first occurrence of each key; later ones in the same upload are conflicts too
+    pending = {}
+    for line, row in chunk:
+        if row[key] in pending:
+            report["errors"].append({"line": line, "error": f"Duplicate {key} in upload"})
+        else:
+            pending[row[key]] = (line, row)
+    inserted = _bulk_insert(db, model, key, [row for _, row in pending.values()])
+    if inserted:
+        CountService.adjust(db, model, len(inserted))
+    db.commit()
+    report["inserted"] += len(inserted)
+    for value, (line, _) in pending.items():
+        if value not in inserted:
+            report["errors"].append({"line": line, "error": conflict_detail})
+
+
+def _finish(report: dict) -> dict:
+    report["errors"].sort(key=lambda error: error["line"])
+    report["failed"] = len(report["errors"])
+    return report
+
+
+def _book_import() -> dict:
+    return dict(
+        schema=schemas.BookCreate,
+        model=models.book.Book,
+        key="isbn",
+        conflict_detail="ISBN already exists",
+        to_row=lambda book: {**book.model_dump(), "available_copies": book.total_copies},
+    )
+
+
+def _member_import() -> dict:
+    return dict(
+        schema=schemas.MemberCreate,
+        model=models.member.Member,
+        key="email",
+        conflict_detail="Email already registered",
+        to_row=lambda member: member.model_dump(),
+    )
+
+
+class ImportService:
+    @staticmethod
+    def import_books(db: Session, fileobj, fmt: str) -> dict:
+        return ImportService._import(db, fileobj, fmt, **_book_import())
+
+    @staticmethod
+    def import_members(db: Session, fileobj, fmt: str) -> dict:
+        return ImportService._import(db, fileobj, fmt, **_member_import())
+
+    @staticmethod
+    def _import(db: Session, fileobj, fmt: str, schema, model, key: str, conflict_detail: str, to_row) -> dict:
+        report = {"processed": 0, "inserted": 0, "errors": []}
+        for chunk in _parse(fileobj, fmt, schema, to_row, report):
+            _write(db, chunk, model, key, conflict_detail, report)
+        return _finish(report)
+
+
+class AsyncImportService:
+    @staticmethod
+    async def import_books(db, fileobj, fmt: str) -> dict:
+        return await AsyncImportService._import(db, fileobj, fmt, **_book_import())
+
+    @staticmethod
+    async def import_members(db, fileobj, fmt: str) -> dict:
+        return await AsyncImportService._import(db, fileobj, fmt, **_member_import())
+
+    @staticmethod
+    async def _import(db, fileobj, fmt: str, schema, model, key: str, conflict_detail: str, to_row) -> dict:
+        report = {"processed": 0, "inserted": 0, "errors": []}
+        chunks = _parse(fileobj, fmt, schema, to_row, report)
+        # An AsyncSession's run_sync executes on the event loop, so only the writes go through it;
+        # reading, parsing and validating each chunk happens in a worker thread
+        while (chunk := await run_in_threadpool(next, chunks, None)) is not None:
+            await run_sync_session(db, _write, chunk, model, key, conflict_detail, report)
+        return _finish(report)
@@ -1,6 +1,16 @@
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app import models, schemas
+from app.cache import create_cache
+from app.database import run_sync_session
+from app.services.book_service import ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL
+from app.services.count_service import CountService
+from app.pagination import decode_cursor
+from app.serialization import response_columns
+# member id -> serialized MemberResponse
+member_cache = create_cache("members", ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL)
+
 
 class MemberService:
     @staticmethod
@@ -11,13 +21,24 @@ class MemberService:
         member_data = member_in.model_dump()
         db_member = models.member.Member(**member_data)    
         db.add(db_member)
+        db.flush()
+        CountService.adjust(db, models.member.Member, 1)
         db.commit()
         db.refresh(db_member)
         return db_member
     
     @staticmethod
-    def get_all(db: Session, skip: int = 0, limit: int = 10):
-        return db.query(models.member.Member).offset(skip).limit(limit).all()
+    def get_all(db: Session, skip: int = 0, limit: int = 10, cursor: str = None):
+        query = db.query(*response_columns(models.member.Member, schemas.MemberResponse)).order_by(models.member.Member.id)
+        if cursor:
+            query = query.filter(models.member.Member.id > decode_cursor(cursor))
+        else:
+            query = query.offset(skip)
+        return query.limit(limit).all()
+
+    @staticmethod
+    def count(db: Session) -> tuple[int, bool]:
+        return CountService.total(db, models.member.Member), True
 
     @staticmethod
     def get_one(db: Session, member_id: int):
@@ -26,6 +47,34 @@ class MemberService:
             raise HTTPException(status_code=404, detail="Member not found")
         return db_member
 
+    @staticmethod
+    def get_version(db: Session, member_id: int) -> int:
+        version = db.query(models.member.Member.version).filter(models.member.Member.id == member_id).scalar()
+        if version is None:
+            raise HTTPException(status_code=404, detail="Member not found")
+        return version
+
+    @staticmethod
+    def reconcile_active_borrow_counts(db: Session) -> int:
+        """Recompute active_borrow_count from borrow_records, returning how many members were off."""
+        Member = models.member.Member
+        BorrowRecord = models.borrow.BorrowRecord
+        actual = (
+            select(func.count())
+            .select_from(BorrowRecord)
+            .where(BorrowRecord.member_id == Member.id, BorrowRecord.returned_at == None)
+            .scalar_subquery()
+        )
+        fixed = db.execute(
+            update(Member)
+            .where(Member.active_borrow_count != actual)
+            .values(active_borrow_count=actual)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        member_cache.clear()
+        return fixed
+
     @staticmethod
     def delete(db: Session, member_id: int):
            db_member = db.query(models.member.Member).filter(models.member.Member.id == member_id).first()
@@ -33,6 +82,43 @@ class MemberService:
             raise HTTPException(status_code=404, detail="Member not found")
             
            db.delete(db_member)
+           db.flush()
+           CountService.adjust(db, models.member.Member, -1)
            db.commit()
+           member_cache.delete(member_id)
            return {"message": f"Member with id {member_id} has been deleted successfully"}
 
+
+class AsyncMemberService:
+    @staticmethod
+    async def create(db, member_in: schemas.MemberCreate):
+        return await run_sync_session(db, MemberService.create, member_in)
+
+    @staticmethod
+    async def get_all(db, skip: int = 0, limit: int = 10, cursor: str = None):
+        return await run_sync_session(db, MemberService.get_all, skip, limit, cursor)
+
+    @staticmethod
+    async def count(db) -> tuple[int, bool]:
+        return await run_sync_session(db, MemberService.count)
+
+    @staticmethod
+    async def get_one(db, member_id: int):
+        cached = member_cache.get(member_id)
+        if cached is not None:
+            return cached
+        db_member = await run_sync_session(db, MemberService.get_one, member_id)
+        member = schemas.MemberResponse.model_validate(db_member).model_dump(mode="json")
+        member_cache.set(member_id, member)
+        return member
+
+    @staticmethod
+    async def get_version(db, member_id: int) -> int:
+        cached = member_cache.get(member_id)
+        if cached is not None:
+            return cached["version"]
+        return await run_sync_session(db, MemberService.get_version, member_id)
+
+    @staticmethod
+    async def delete(db, member_id: int):
+        return await run_sync_session(db, MemberService.delete, member_id)
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, and_, delete, func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+from app import models, schemas
+from app.database import AsyncSessionLocal, SessionLocal, run_sync_session
+from app.pagination import decode_cursor
+from app.serialization import response_columns
+
+# Seconds between background rebuilds of overdue_summaries; 0 disables the sweep
+OVERDUE_SWEEP_INTERVAL = float(os.getenv("OVERDUE_SWEEP_INTERVAL", "300"))
+# Postgres advisory-lock key that serializes rebuilds across workers and hosts
+OVERDUE_SWEEP_LOCK_ID = 7301
+
+logger = logging.getLogger(__name__)
+
+
+class OverdueService:
+    @staticmethod
+    def get_overdue(db: Session, as_of: datetime = None, member_id: int = None, book_id: int = None, limit: int = 100, cursor: str = None):
+        BorrowRecord = models.borrow.BorrowRecord
+        as_of = as_of or datetime.now()
+        # returned_at IS NULL plus a due_date range keeps the scan on ix_borrow_records_overdue
+        query = db.query(*response_columns(BorrowRecord, schemas.BorrowResponse)).filter(
+            BorrowRecord.returned_at == None, BorrowRecord.due_date < as_of
+        )
+        if member_id:
+            query = query.filter(BorrowRecord.member_id == member_id)
+        if book_id:
+            query = query.filter(BorrowRecord.book_id == book_id)
+        query = query.order_by(BorrowRecord.due_date, BorrowRecord.id)
+        if cursor:
+            last_id = decode_cursor(cursor)
+            last_due_date = select(BorrowRecord.due_date).where(BorrowRecord.id == last_id).scalar_subquery()
+            query = query.filter(or_(
+                BorrowRecord.due_date > last_due_date,
+                and_(BorrowRecord.due_date == last_due_date, BorrowRecord.id > last_id),
+            ))
+        return query.limit(limit).all()
+
+    @staticmethod
+    def get_summary(db: Session, scope: str = "member", skip: int = 0, limit: int = 50):
+        OverdueSummary = models.overdue.OverdueSummary
+        return (
+            db.query(OverdueSummary)
+            .filter(OverdueSummary.scope == scope)
+            .order_by(OverdueSummary.overdue_count.desc(), OverdueSummary.entity_id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    @staticmethod
+    def refresh_summary(db: Session, as_of: datetime = None, skip_if_running: bool = False) -> dict | None:
+        """Rebuild overdue_summaries from open loans in one transaction.
+
+        With `skip_if_running`, returns None instead when another worker is rebuilding or just has.
+        """
+        BorrowRecord = models.borrow.BorrowRecord
+        OverdueSummary = models.overdue.OverdueSummary
+        # as_of only moves the overdue cut-off; freshness is wall-clock time, so a rebuild evaluated
+        # against a future date cannot hold off the background sweep until that date
+        now = datetime.now()
+        as_of = as_of or now
+        refreshed_at = literal(now, DateTime(timezone=True))
+        columns = ["scope", "entity_id", "overdue_count", "oldest_due_date", "refreshed_at"]
+
+        # SQLite already serializes writers; on Postgres two overlapping rebuilds would collide on the primary key
+        if db.get_bind().dialect.name == "postgresql":
+            if not skip_if_running:
+                db.execute(select(func.pg_advisory_xact_lock(OVERDUE_SWEEP_LOCK_ID)))
+            elif not db.execute(select(func.pg_try_advisory_xact_lock(OVERDUE_SWEEP_LOCK_ID))).scalar():
+                db.rollback()
+                return None
+        if skip_if_running:
+            # Every worker runs the sweeper; only the first one each interval needs to rebuild
+            recent = literal(now - timedelta(seconds=OVERDUE_SWEEP_INTERVAL / 2), DateTime(timezone=True))
+            if db.execute(select(OverdueSummary.scope).where(OverdueSummary.refreshed_at > recent).limit(1)).first():
+                db.rollback()
+                return None
+
+        db.execute(delete(OverdueSummary))
+        for scope, key in (("member", BorrowRecord.member_id), ("book", BorrowRecord.book_id)):
+            db.execute(insert(OverdueSummary).from_select(
+                columns,
+                select(literal(scope), key, func.count(), func.min(BorrowRecord.due_date), refreshed_at)
+                .where(BorrowRecord.returned_at == None, BorrowRecord.due_date < as_of)
+                .group_by(key),
+            ))
+        totals = dict(db.execute(
+            select(OverdueSummary.scope, func.count()).group_by(OverdueSummary.scope)
+        ).all())
+        overdue_loans = db.execute(
+            select(func.coalesce(func.sum(OverdueSummary.overdue_count), 0))
+            .where(OverdueSummary.scope == "member")
+        ).scalar_one()
+        db.commit()
+        return {
+            "overdue_loans": overdue_loans,
+            "members": totals.get("member", 0),
+            "books": totals.get("book", 0),
+            "refreshed_at": now,
+        }
+
+
+class AsyncOverdueService:
+    @staticmethod
+    async def get_overdue(db, as_of: datetime = None, member_id: int = None, book_id: int = None, limit: int = 100, cursor: str = None):
+        return await run_sync_session(db, OverdueService.get_overdue, as_of, member_id, book_id, limit, cursor)
+
+    @staticmethod
+    async def get_summary(db, scope: str = "member", skip: int = 0, limit: int = 50):
+        return await run_sync_session(db, OverdueService.get_summary, scope, skip, limit)
+
+    @staticmethod
+    async def refresh_summary(db, as_of: datetime = None, skip_if_running: bool = False) -> dict | None:
+        return await run_sync_session(db, OverdueService.refresh_summary, as_of, skip_if_running)
+
+
+async def run_overdue_sweep(skip_if_running: bool = False) -> dict | None:
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            return await AsyncOverdueService.refresh_summary(db, skip_if_running=skip_if_running)
+    with SessionLocal() as db:
+        return await AsyncOverdueService.refresh_summary(db, skip_if_running=skip_if_running)
+
+
+async def overdue_sweeper(interval: float = OVERDUE_SWEEP_INTERVAL) -> None:
+    while True:
+        try:
+            await run_overdue_sweep(skip_if_running=True)
+        except Exception:
+            # Keep sweeping; a failed run just leaves the previous summary in place
+            logger.exception("Overdue sweep failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,183 @@
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import models
+from app.database import run_sync_session
+
+
+def upsert(db: Session, model):
+    # Both supported backends spell INSERT ... ON CONFLICT DO UPDATE the same way
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def _increment(db: Session, model, keys: list[str], column: str, rows: list[dict]) -> None:
+    """Add each row's `column` count onto the aggregate row with the same keys, in one executemany."""
+    stmt = upsert(db, model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column: model.__table__.c[column] + stmt.excluded[column]},
+    )
+    db.execute(stmt, rows)
+
+
+def _utc_day(moment: datetime) -> date:
+    # Naive timestamps are already UTC: the default return_date and SQLite's CURRENT_TIMESTAMP both are
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.date()
+
+
+def _utc_date(db: Session, column):
+    # SQLite stores the UTC wall time without an offset; Postgres would otherwise use the session time zone
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date(func.timezone("UTC", column))
+    return func.date(column)
+
+
+def _window_start(days: int) -> date:
+    # Aggregates are keyed by the UTC day of borrowed_at/returned_at
+    return datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+
+
+class StatsService:
+    @staticmethod
+    def record(db: Session, at: datetime, loans: list[tuple[int, int]], column: str) -> None:
+        """Count one borrow or return per (book_id, member_id) in the aggregates for the UTC day of `at`.
+
+        Runs inside the caller's transaction, so the aggregates commit or roll back with the loan.
+        """
+        if not loans:
+            return
+        other = "returns" if column == "borrows" else "borrows"
+        day = _utc_day(at)
+
+        def rows(key: str, counts: Counter) -> list[dict]:
+            # Sorted so concurrent transactions lock aggregate rows in the same order
+            return [{"day": day, key: entity_id, column: count, other: 0} for entity_id, count in sorted(counts.items())]
+
+        _increment(db, models.stats.BookDailyStats, ["day", "book_id"], column,
+                   rows("book_id", Counter(book_id for book_id, _ in loans)))
+        _increment(db, models.stats.MemberDailyStats, ["day", "member_id"], column,
+                   rows("member_id", Counter(member_id for _, member_id in loans)))
+
+    @staticmethod
+    def rebuild(db: Session) -> dict:
+        """Recompute every aggregate from borrow_records, e.g. after a backfill or migration."""
+        BorrowRecord = models.borrow.BorrowRecord
+        # One row per event: the borrow on its borrowed_at day, the return on its returned_at day
+        events = union_all(
+            select(
+                _utc_date(db, BorrowRecord.borrowed_at).label("day"), BorrowRecord.book_id, BorrowRecord.member_id,
+                literal(1).label("borrows"), literal(0).label("returns"),
+            ),
+            select(
+                _utc_date(db, BorrowRecord.returned_at).label("day"), BorrowRecord.book_id, BorrowRecord.member_id,
+                literal(0).label("borrows"), literal(1).label("returns"),
+            ).where(BorrowRecord.returned_at != None),
+        ).subquery()
+
+        counts = {}
+        for model, keys in (
+            (models.stats.BookDailyStats, [events.c.book_id]),
+            (models.stats.MemberDailyStats, [events.c.member_id]),
+        ):
+            db.execute(delete(model))
+            db.execute(model.__table__.insert().from_select(
+                ["day", *(key.name for key in keys), "borrows", "returns"],
+                select(events.c.day, *keys, func.sum(events.c.borrows), func.sum(events.c.returns))
+                .group_by(events.c.day, *keys),
+            ))
+            counts[model.__tablename__] = db.execute(select(func.count()).select_from(model)).scalar_one()
+        db.commit()
+        return counts
+
+    @staticmethod
+    def top_books(db: Session, days: int = 30, limit: int = 10):
+        Book = models.book.Book
+        BookDailyStats = models.stats.BookDailyStats
+        totals = (
+            select(BookDailyStats.book_id, func.sum(BookDailyStats.borrows).label("borrows"))
+            .where(BookDailyStats.day >= _window_start(days))
+            .group_by(BookDailyStats.book_id)
+            .order_by(func.sum(BookDailyStats.borrows).desc(), BookDailyStats.book_id)
+            .limit(limit)
+            .subquery()
+        )
+        return db.execute(
+            select(totals.c.book_id, Book.title, Book.author, totals.c.borrows)
+            .join(Book, Book.id == totals.c.book_id)
+            .order_by(totals.c.borrows.desc(), totals.c.book_id)
+        ).all()
+
+    @staticmethod
+    def top_members(db: Session, days: int = 30, limit: int = 10):
+        Member = models.member.Member
+        MemberDailyStats = models.stats.MemberDailyStats
+        totals = (
+            select(MemberDailyStats.member_id, func.sum(MemberDailyStats.borrows).label("borrows"))
+            .where(MemberDailyStats.day >= _window_start(days))
+            .group_by(MemberDailyStats.member_id)
+            .order_by(func.sum(MemberDailyStats.borrows).desc(), MemberDailyStats.member_id)
+            .limit(limit)
+            .subquery()
+        )
+        return db.execute(
+            select(totals.c.member_id, Member.full_name, totals.c.borrows)
+            .join(Member, Member.id == totals.c.member_id)
+            .order_by(totals.c.borrows.desc(), totals.c.member_id)
+        ).all()
+
+    @staticmethod
+    def daily(db: Session, days: int = 30):
+        BookDailyStats = models.stats.BookDailyStats
+        # Summed from the per-book rows (keyed by day first) rather than kept in one row per day,
+        # which every concurrent borrow and return would have to lock
+        return db.execute(
+            select(
+                BookDailyStats.day,
+                func.sum(BookDailyStats.borrows).label("borrows"),
+                func.sum(BookDailyStats.returns).label("returns"),
+            )
+            .where(BookDailyStats.day >= _window_start(days))
+            .group_by(BookDailyStats.day)
+            .order_by(BookDailyStats.day)
+        ).all()
+
+    @staticmethod
+    def utilization(db: Session, limit: int = 10):
+        Book = models.book.Book
+        # Served by ix_books_on_loan, so the top of the list is read without scanning books
+        on_loan = (Book.total_copies - Book.available_copies).label("on_loan")
+        return db.execute(
+            select(Book.id.label("book_id"), Book.title, Book.total_copies, on_loan)
+            .where(Book.total_copies - Book.available_copies > 0)
+            .order_by((Book.total_copies - Book.available_copies).desc(), Book.id)
+            .limit(limit)
+        ).all()
+
+
+class AsyncStatsService:
+    @staticmethod
+    async def rebuild(db) -> dict:
+        return await run_sync_session(db, StatsService.rebuild)
+
+    @staticmethod
+    async def top_books(db, days: int = 30, limit: int = 10):
+        return await run_sync_session(db, StatsService.top_books, days, limit)
+
+    @staticmethod
+    async def top_members(db, days: int = 30, limit: int = 10):
+        return await run_sync_session(db, StatsService.top_members, days, limit)
+
+    @staticmethod
+    async def daily(db, days: int = 30):
+        return await run_sync_session(db, StatsService.daily, days)
+
+    @staticmethod
+    async def utilization(db, limit: int = 10):
+        return await run_sync_session(db, StatsService.utilization, limit)
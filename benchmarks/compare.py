@@ -0,0 +1,45 @@
+"""Compare two benchmark result files, e.g. `python -m benchmarks.compare base.json new.json`.
+
+Exits with status 1 when any case's p95 latency regressed by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    regressions = []
+    print(f"{'case':<32} {'base p95':>10} {'new p95':>10} {'change':>9} {'base ops/s':>11} {'new ops/s':>11}")
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:<32} {'-':>10} {new['p95_ms']:>10.2f} {'new':>9}")
+            continue
+        change = (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<32} {old['p95_ms']:>10.2f} {new['p95_ms']:>10.2f} {change:>+8.1f}% "
+            f"{old['ops_per_sec']:>11.1f} {new['ops_per_sec']:>11.1f}{flag}"
+        )
+    return regressions
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p95 slowdown in percent")
+    args = parser.parse_args(argv)
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    with open(args.current) as fh:
+        current = json.load(fh)
+    if compare(baseline, current, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
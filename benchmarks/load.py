@@ -0,0 +1,143 @@
+"""Mixed HTTP load against a running server, e.g. `python -m benchmarks.load --duration 60 -o load.json`.
+
+Workers loop over a weighted mix of search, book lookup, borrow, return and login requests
+and report latency percentiles and throughput per operation and overall.
+"""
+import argparse
+import asyncio
+import time
+from collections import deque
+from random import Random
+
+import httpx
+
+from benchmarks.report import print_table, summarize, write_results
+from benchmarks.seed import BENCH_PASSWORD, BENCH_USERNAME, WORDS
+
+DEFAULT_MIX = "search=40,get_book=20,borrow=15,return=15,login=10"
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown operations: {', '.join(sorted(unknown))}")
+    return mix
+
+
+class LoadRun:
+    def __init__(self, client: httpx.AsyncClient, args, token: str):
+        self.client = client
+        self.args = args
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.open_borrows = deque()
+        self.samples = {name: [] for name in OPERATIONS}
+        self.errors = {name: 0 for name in OPERATIONS}
+        self.rejected = {name: 0 for name in OPERATIONS}
+
+    async def search(self, rng: Random) -> httpx.Response:
+        return await self.client.get("/books/search", params={"q": rng.choice(WORDS), "limit": 20})
+
+    async def get_book(self, rng: Random) -> httpx.Response:
+        return await self.client.get(f"/books/{rng.randint(1, self.args.books)}")
+
+    async def borrow(self, rng: Random) -> httpx.Response:
+        response = await self.client.post("/borrows/", headers=self.headers, json={
+            "book_id": rng.randint(1, self.args.books), "member_id": rng.randint(1, self.args.members)
+        })
+        if response.status_code == 200:
+            self.open_borrows.append(response.json()["id"])
+        return response
+
+    async def return_(self, rng: Random) -> httpx.Response:
+        if not self.open_borrows:
+            return await self.borrow(rng)
+        return await self.client.post(f"/borrows/{self.open_borrows.popleft()}/return", headers=self.headers, json={})
+
+    async def login(self, rng: Random) -> httpx.Response:
+        return await self.client.post(
+            "/auth/token", data={"username": self.args.username, "password": self.args.password}
+        )
+
+    async def worker(self, worker_id: int, deadline: float, mix: dict) -> None:
+        rng = Random(self.args.seed + worker_id)
+        names, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await OPERATIONS[name](self, rng)
+            except httpx.HTTPError:
+                self.errors[name] += 1
+                continue
+            self.samples[name].append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                self.errors[name] += 1
+            elif response.status_code >= 400:
+                # Borrow limits, no copies left and similar business rejections
+                self.rejected[name] += 1
+
+
+OPERATIONS = {
+    "search": LoadRun.search,
+    "get_book": LoadRun.get_book,
+    "borrow": LoadRun.borrow,
+    "return": LoadRun.return_,
+    "login": LoadRun.login,
+}
+
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        response = await client.post("/auth/token", data={"username": args.username, "password": args.password})
+        response.raise_for_status()
+        load = LoadRun(client, args, response.json()["access_token"])
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(load.worker(index, deadline, args.mix) for index in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        # Give back loans still open so the dataset does not drift between runs
+        while load.open_borrows:
+            await client.post(f"/borrows/{load.open_borrows.popleft()}/return", headers=load.headers, json={})
+
+    results = {}
+    for name in args.mix:
+        results[name] = {**summarize(load.samples[name], load.errors[name], elapsed), "rejected": load.rejected[name]}
+    all_samples = [sample for samples in load.samples.values() for sample in samples]
+    results["total"] = {
+        **summarize(all_samples, sum(load.errors.values()), elapsed),
+        "rejected": sum(load.rejected.values()),
+    }
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--books", type=int, default=1_000_000, help="highest seeded book id")
+    parser.add_argument("--members", type=int, default=200_000, help="highest seeded member id")
+    parser.add_argument("--username", default=BENCH_USERNAME)
+    parser.add_argument("--password", default=BENCH_PASSWORD)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("-o", "--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    if args.output:
+        params = {**vars(args), "password": None}
+        write_results(args.output, "load", params, results, base_url=args.base_url)
+
+
+if __name__ == "__main__":
+    main()
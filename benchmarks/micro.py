@@ -0,0 +1,115 @@
+"""Time service methods against a seeded database, e.g. `python -m benchmarks.micro -o micro.json`.
+
+Each case calls an app/services method directly on a Session, so the numbers exclude HTTP,
+serialization and auth and isolate query cost.
+"""
+import argparse
+import time
+from random import Random
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app import schemas
+from app.database import SessionLocal, engine
+import app.models  # noqa: F401  (registers every mapper before services run queries)
+from app.models.book import Book
+from app.models.member import Member
+from app.services.auth_service import AuthService
+from app.services.book_service import BookService
+from app.services.borrow_service import BorrowService
+from app.services.member_service import MemberService
+from app.services.overdue_service import OverdueService
+from benchmarks.report import print_table, summarize, write_results
+from benchmarks.seed import BENCH_PASSWORD, BENCH_USERNAME, WORDS
+
+# bcrypt dominates login, so it gets fewer iterations than the query-bound cases
+AUTH_ITERATIONS = 20
+
+
+def build_cases(books: int, members: int) -> dict:
+    """Map case name to fn(db, rng, state); state carries borrow ids from borrow to return."""
+    def borrow(db, rng, state):
+        record = BorrowService.borrow_book(db, schemas.BorrowCreate(
+            book_id=rng.randint(1, books), member_id=rng.randint(1, members)
+        ))
+        state.append(record.id)
+
+    def return_(db, rng, state):
+        if state:
+            BorrowService.return_book(db, state.pop(), schemas.BorrowReturn())
+
+    return {
+        "book_service.get_one": lambda db, rng, state: BookService.get_one(db, rng.randint(1, books)),
+        "book_service.get_all": lambda db, rng, state: BookService.get_all(db, limit=50),
+        "book_service.get_all_by_author": lambda db, rng, state: BookService.get_all(db, author="Knuth", limit=50),
+        "book_service.search": lambda db, rng, state: BookService.search(db, rng.choice(WORDS), limit=20),
+        "member_service.get_one": lambda db, rng, state: MemberService.get_one(db, rng.randint(1, members)),
+        "member_service.get_all": lambda db, rng, state: MemberService.get_all(db, limit=50),
+        "borrow_service.get_member_history": lambda db, rng, state: BorrowService.get_member_history(
+            db, rng.randint(1, members), order="desc", limit=50
+        ),
+        "borrow_service.borrow_book": borrow,
+        "borrow_service.return_book": return_,
+        "overdue_service.get_overdue": lambda db, rng, state: OverdueService.get_overdue(db, limit=100),
+        "auth_service.authenticate_user": lambda db, rng, state: AuthService.authenticate_user(
+            db, BENCH_USERNAME, BENCH_PASSWORD
+        ),
+    }
+
+
+def run_case(fn, iterations: int, warmup: int, rng: Random, state: list) -> dict:
+    samples, errors = [], 0
+    with SessionLocal() as db:
+        for index in range(warmup + iterations):
+            started = time.perf_counter()
+            try:
+                fn(db, rng, state)
+            except HTTPException:
+                # Expected business outcomes, e.g. the borrow limit on a random member
+                errors += 1
+                db.rollback()
+            elapsed = time.perf_counter() - started
+            if index >= warmup:
+                samples.append(elapsed)
+            # Keep the identity map from turning later iterations into cache hits
+            db.expunge_all()
+    return summarize(samples, errors)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.micro")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--case", action="append", help="only run cases whose name contains this text")
+    parser.add_argument("-o", "--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    with SessionLocal() as db:
+        books = db.scalar(select(func.max(Book.id))) or 0
+        members = db.scalar(select(func.max(Member.id))) or 0
+    if not books or not members:
+        raise SystemExit("No data found; seed the database with `python -m benchmarks.seed` first")
+
+    rng = Random(args.seed)
+    state = []
+    results = {}
+    for name, fn in build_cases(books, members).items():
+        if args.case and not any(pattern in name for pattern in args.case):
+            continue
+        iterations = min(args.iterations, AUTH_ITERATIONS) if name.startswith("auth_service") else args.iterations
+        results[name] = run_case(fn, iterations, min(args.warmup, iterations), rng, state)
+    # Borrows that had no matching return in this run are given back so reruns start clean
+    with SessionLocal() as db:
+        while state:
+            BorrowService.return_book(db, state.pop(), schemas.BorrowReturn())
+
+    print_table(results)
+    if args.output:
+        params = {**vars(args), "books": books, "members": members}
+        write_results(args.output, "micro", params, results, database=engine.dialect.name)
+
+
+if __name__ == "__main__":
+    main()
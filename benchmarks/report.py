@@ -0,0 +1,68 @@
+"""Latency summaries and JSON result files shared by the benchmark scripts."""
+import json
+import math
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: list[float], errors: int = 0, elapsed: float | None = None) -> dict:
+    """Summarize latencies given in seconds; throughput uses wall time when it is known."""
+    ordered = sorted(samples)
+    busy = elapsed if elapsed else sum(ordered)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+        "ops_per_sec": len(ordered) / busy if busy else 0.0,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(**extra) -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        **extra,
+    }
+
+
+def print_table(results: dict) -> None:
+    print(f"{'case':<32} {'count':>8} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10}")
+    for name, stats in results.items():
+        print(
+            f"{name:<32} {stats['count']:>8} {stats['errors']:>5} {stats['p50_ms']:>9.2f} "
+            f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['ops_per_sec']:>10.1f}"
+        )
+
+
+def write_results(path: str, kind: str, params: dict, results: dict, **extra) -> None:
+    with open(path, "w") as fh:
+        json.dump(
+            {"kind": kind, "environment": environment(**extra), "params": params, "results": results},
+            fh, indent=2,
+        )
+    print(f"Results written to {path}")
@@ -0,0 +1,193 @@
+"""Seed a synthetic library into DATABASE_URL, e.g. `python -m benchmarks.seed --books 1000000`.
+
+The same --seed and --anchor always produce the same rows, so runs on different
+machines or commits benchmark identical data.
+"""
+import argparse
+import time
+from array import array
+from datetime import datetime, timedelta
+from random import Random
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from app.database import Base, engine
+from app.hashing import hash_password_sync
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.models.book import Book
+from app.models.borrow import BorrowRecord
+from app.models.member import Member
+from app.models.users import Users
+from app.services.borrow_service import MAX_ACTIVE_BORROWS
+from app.services.count_service import CountService
+
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench-password"
+
+WORDS = (
+    "silent river garden night shadow empire glass winter letter house ocean city secret "
+    "stone fire crown storm road forest memory paper light island clock mountain queen "
+    "history machine dream wolf harbor bridge song journey star desert mirror code theory "
+    "kingdom orchard engine atlas signal lantern voyage archive north field meadow"
+).split()
+FIRST_NAMES = (
+    "Ada Alan Grace Linus Margaret Ken Barbara Donald Edsger Frances Guido Hedy Ivan "
+    "Jean Katherine Leslie Mary Niklaus Radia Sophie Tim Ursula Vint Whitfield"
+).split()
+LAST_NAMES = (
+    "Lovelace Turing Hopper Torvalds Hamilton Thompson Liskov Knuth Dijkstra Allen Rossum "
+    "Lamarr Sutherland Sammet Johnson Lamport Shelley Wirth Perlman Wilson Berners Franklin Cerf Diffie"
+).split()
+
+BATCH_SIZE = 10_000
+LOAN_DAYS = 14
+HISTORY_DAYS = 3 * 365
+
+
+def _batched(rows, size: int = BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(conn, table, rows, total: int, label: str) -> None:
+    started = time.perf_counter()
+    done = 0
+    for batch in _batched(rows):
+        conn.execute(insert(table), batch)
+        done += len(batch)
+        if done % (BATCH_SIZE * 50) == 0 or done == total:
+            print(f"  {label}: {done:,}/{total:,} ({time.perf_counter() - started:.1f}s)")
+
+
+def generate_books(rng: Random, count: int):
+    for book_id in range(1, count + 1):
+        copies = rng.randint(1, 8)
+        yield {
+            "id": book_id,
+            "title": " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(2, 4))),
+            "author": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "isbn": f"978{book_id:010d}",
+            "total_copies": copies,
+            "available_copies": copies,
+        }
+
+
+def generate_members(rng: Random, count: int):
+    for member_id in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            "id": member_id,
+            "full_name": f"{first} {last}",
+            "email": f"{first.lower()}.{last.lower()}.{member_id}@example.com",
+        }
+
+
+def generate_borrows(rng: Random, count: int, total_copies: array, on_loan: array, open_loans: array, anchor: datetime, open_ratio: float):
+    """Yield loans spread over HISTORY_DAYS; a small share stays open within the real limits.
+
+    on_loan and open_loans are filled in with the open loans per book and per member.
+    """
+    book_count = len(total_copies) - 1
+    member_count = len(open_loans) - 1
+    for _ in range(count):
+        book_id = rng.randint(1, book_count)
+        member_id = rng.randint(1, member_count)
+        keep_open = (
+            rng.random() < open_ratio
+            and on_loan[book_id] < total_copies[book_id]
+            and open_loans[member_id] < MAX_ACTIVE_BORROWS
+        )
+        if keep_open:
+            # Recent enough that some are still on time and some are overdue
+            borrowed_at = anchor - timedelta(seconds=rng.randint(0, 2 * LOAN_DAYS * 86400))
+            returned_at = None
+            on_loan[book_id] += 1
+            open_loans[member_id] += 1
+        else:
+            borrowed_at = anchor - timedelta(seconds=rng.randint(LOAN_DAYS * 86400, HISTORY_DAYS * 86400))
+            returned_at = borrowed_at + timedelta(seconds=rng.randint(3600, 2 * LOAN_DAYS * 86400))
+        yield {
+            "book_id": book_id,
+            "member_id": member_id,
+            "borrowed_at": borrowed_at,
+            "due_date": borrowed_at + timedelta(days=LOAN_DAYS),
+            "returned_at": returned_at,
+        }
+
+
+def _set_counts(conn, table, column: str, values: dict) -> None:
+    stmt = update(table).where(table.c.id == bindparam("row_id")).values({column: bindparam("value")})
+    for batch in _batched({"row_id": row_id, "value": value} for row_id, value in values.items()):
+        conn.execute(stmt, batch)
+
+
+def seed(books: int, members: int, borrows: int, seed_value: int, anchor: datetime, open_ratio: float, reset: bool) -> None:
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(Book)).scalar():
+            raise SystemExit("books is not empty; rerun with --reset to rebuild the dataset")
+
+    rng = Random(seed_value)
+    total_copies = array("i", [0]) * (books + 1)
+    on_loan = array("i", [0]) * (books + 1)
+    open_loans = array("i", [0]) * (members + 1)
+
+    def books_with_copies():
+        for row in generate_books(rng, books):
+            total_copies[row["id"]] = row["total_copies"]
+            yield row
+
+    print(f"Seeding {books:,} books, {members:,} members and {borrows:,} borrow records")
+    with engine.begin() as conn:
+        _insert(conn, Book.__table__, books_with_copies(), books, "books")
+        _insert(conn, Member.__table__, generate_members(rng, members), members, "members")
+        rows = generate_borrows(rng, borrows, total_copies, on_loan, open_loans, anchor, open_ratio)
+        _insert(conn, BorrowRecord.__table__, rows, borrows, "borrow_records")
+        if conn.dialect.name == "postgresql":
+            # Explicit ids bypass the serial sequences; move them past the seeded rows so API inserts don't collide
+            for table in (Book.__table__, Member.__table__):
+                conn.execute(select(func.setval(
+                    func.pg_get_serial_sequence(table.name, "id"), select(func.max(table.c.id)).scalar_subquery()
+                )))
+
+        # Counters the API maintains incrementally, set once from the generated open loans
+        _set_counts(conn, Book.__table__, "available_copies", {
+            book_id: total_copies[book_id] - loaned for book_id, loaned in enumerate(on_loan) if loaned
+        })
+        _set_counts(conn, Member.__table__, "active_borrow_count", {
+            member_id: count for member_id, count in enumerate(open_loans) if count
+        })
+        CountService.refresh(conn)
+
+        if conn.execute(select(Users.id).where(Users.username == BENCH_USERNAME)).first() is None:
+            conn.execute(insert(Users.__table__).values(
+                username=BENCH_USERNAME, hashed_password=hash_password_sync(BENCH_PASSWORD)
+            ))
+    print(f"Done. Log in as {BENCH_USERNAME!r} / {BENCH_PASSWORD!r}")
+
+
+def main(argv=None) -> None:
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.seed")
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--members", type=int, default=200_000)
+    parser.add_argument("--borrows", type=int, default=10_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=datetime.fromisoformat, default=today,
+                        help="'now' of the dataset; defaults to midnight today")
+    parser.add_argument("--open-ratio", type=float, default=0.02, help="share of loans left unreturned")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args(argv)
+    seed(args.books, args.members, args.borrows, args.seed, args.anchor, args.open_ratio, args.reset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Production server settings: `gunicorn -c gunicorn.conf.py app.main:app`."""
+import os
+
+from app.cache import CACHE_BACKEND
+from app.pubsub import PUBSUB_BACKEND
+
+
+def _cpu_count() -> int:
+    # Honours CPU pinning (e.g. `docker run --cpuset-cpus`), unlike os.cpu_count()
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# Entity and auth caches, idempotency claims, read-your-writes pins and availability streams live in each
+# process unless both backends are Redis; workers on the memory backends would serve each other's stale
+# state, e.g. keep authenticating a deleted user until AUTH_CACHE_TTL runs out
+SHARED_STATE = CACHE_BACKEND == "redis" and PUBSUB_BACKEND == "redis"
+# One event loop per core; every worker has its own pool of DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+workers = int(os.getenv("WEB_CONCURRENCY", str(_cpu_count() if SHARED_STATE else 1)))
+if workers > 1 and not SHARED_STATE:
+    raise RuntimeError(
+        f"WEB_CONCURRENCY={workers} needs CACHE_BACKEND=redis and PUBSUB_BACKEND=redis "
+        "so workers share caches, idempotency keys and availability events"
+    )
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the app once in the master, so forked (and recycled) workers start without re-importing
+preload_app = True
+
+# Restart each worker after this many requests, staggered by the jitter; 0 disables recycling
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+# In-flight requests get this long to finish when a worker is recycled or the pod stops
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+
+def when_ready(server):
+    # The auth stack is imported lazily; load it before forking so workers share it instead of paying on first login
+    import jose.jwt  # noqa: F401
+    from app.hashing import get_bcrypt_context
+
+    get_bcrypt_context().handler("bcrypt").get_backend()
+
+
+def post_fork(server, worker):
+    from app.database import reset_pools_after_fork
+
+    reset_pools_after_fork()
@@ -1,10 +1,18 @@
+import os
+from types import SimpleNamespace
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
+from app.cache import CACHES
 from app.database import Base
+from app.dependencies import get_current_user, get_db
 from app.main import app
-from app.routers import book, member, borrow
+from app.query_diagnostics import REPEATED_QUERY_THRESHOLD, track_queries
+
+# Fails any test that runs more statements than this unless it sets its own @pytest.mark.query_budget(n)
+DEFAULT_QUERY_BUDGET = os.getenv('QUERY_BUDGET')
 
 SQLITE_DATABASE_URL = 'sqlite:///./test.db'
 engine = create_engine(SQLITE_DATABASE_URL, connect_args={'check_same_thread': False})
@@ -18,16 +26,25 @@ def client():
             yield db
         finally:
             db.close()
-    # Override all router dependencies
-    app.dependency_overrides[book.get_db] = get_test_db
-    app.dependency_overrides[member.get_db] = get_test_db
-    app.dependency_overrides[borrow.get_db] = get_test_db
+    # Every router resolves its session through get_db
+    app.dependency_overrides[get_db] = get_test_db
+    # Protected routes see a signed-in user
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, username='tester')
     Base.metadata.create_all(bind=engine)
+    # Ids are reused once the tables are recreated, so cached rows must not leak between tests
+    for cache in CACHES.values():
+        cache.clear()
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
     Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture
+def db_session(client):
+    # Reads what the client wrote; closed before the client fixture drops the tables
+    with TestingSessionLocal() as db:
+        yield db
+
 @pytest.fixture
 def sample_book_data():
     return {'title': 'Clean Code', 'author': 'Robert C. Martin', 'isbn': '978-0132350884', 'total_copies': 5}
@@ -35,3 +52,21 @@ def sample_book_data():
 @pytest.fixture
 def sample_member_data():
     return {'full_name': 'John Doe', 'email': 'john.doe@example.com'}
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'query_budget(n): fail the test if it issues more than n SQL statements')
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker('query_budget')
+    budget = marker.args[0] if marker else DEFAULT_QUERY_BUDGET
+    if budget is None:
+        return (yield)
+    # Only the test body is tracked; fixture setup such as create_all does not count
+    with track_queries() as tracker:
+        result = yield
+    if tracker.count > int(budget):
+        repeated = tracker.repeated(REPEATED_QUERY_THRESHOLD)
+        hint = ' (repeated statements suggest an N+1)' if repeated else ''
+        pytest.fail(f'{tracker.count} SQL statements exceeded the budget of {budget}{hint}:\n{tracker.report()}', pytrace=False)
+    return result
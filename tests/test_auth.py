@@ -0,0 +1,75 @@
+import json
+import subprocess
+import sys
+
+from fastapi import status
+
+from app.dependencies import get_current_user
+from app.main import app
+from app.models.users import Users
+
+
+class TestAuthCache:
+    def test_repeated_requests_use_cached_user(self, client, sample_book_data):
+        # Exercise the real token check rather than any test override
+        app.dependency_overrides.pop(get_current_user, None)
+        client.post('/auth/register', json={'username': 'librarian', 'password': 'secret123'})
+        token = client.post('/auth/token', data={'username': 'librarian', 'password': 'secret123'}).json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        before = client.get('/admin/cache', headers=headers).json()
+        response = client.post('/books/', json=sample_book_data, headers=headers)
+        after = client.get('/admin/cache', headers=headers).json()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert after['auth_tokens']['hits'] >= before['auth_tokens']['hits'] + 2
+        assert after['auth_users']['hits'] >= before['auth_users']['hits'] + 2
+
+    def test_deleted_user_is_evicted(self, client, db_session):
+        from app.services.auth_service import user_cache
+        app.dependency_overrides.pop(get_current_user, None)
+        client.post('/auth/register', json={'username': 'librarian', 'password': 'secret123'})
+        token = client.post('/auth/token', data={'username': 'librarian', 'password': 'secret123'}).json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        assert client.get('/admin/cache', headers=headers).status_code == status.HTTP_200_OK
+        # Cached as plain values, so CACHE_BACKEND=redis can share it between workers
+        assert json.loads(json.dumps(user_cache.get('librarian'))) == user_cache.get('librarian')
+
+        db_session.delete(db_session.query(Users).filter(Users.username == 'librarian').one())
+        db_session.commit()
+        assert client.get('/admin/cache', headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_invalid_token_is_rejected(self, client):
+        app.dependency_overrides.pop(get_current_user, None)
+        response = client.get('/admin/cache', headers={'Authorization': 'Bearer not-a-token'})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestPasswordHashing:
+    def test_register_returns_503_when_hash_queue_is_full(self, client, monkeypatch):
+        from app.hashing import password_hasher
+        monkeypatch.setattr(password_hasher, 'max_pending', 0)
+        response = client.post('/auth/register', json={'username': 'librarian', 'password': 'secret123'})
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers['Retry-After'] == '1'
+
+    def test_login_rehashes_when_cost_changes(self, client, db_session, monkeypatch):
+        from passlib.context import CryptContext
+        from app import hashing
+        client.post('/auth/register', json={'username': 'librarian', 'password': 'secret123'})
+        monkeypatch.setattr(hashing, 'bcrypt_context', CryptContext(schemes=['bcrypt'], bcrypt__rounds=4))
+
+        response = client.post('/auth/token', data={'username': 'librarian', 'password': 'secret123'})
+        assert response.status_code == status.HTTP_200_OK
+
+        stored = db_session.query(Users).filter(Users.username == 'librarian').one().hashed_password
+        assert stored.startswith('$2b$04$')
+
+
+class TestStartup:
+    def test_importing_the_app_defers_auth_libraries(self):
+        # A fresh interpreter, since this test process has long since imported them
+        check = 'import sys, app.main; print(sorted(m for m in ("jose", "passlib", "cryptography") if m in sys.modules))'
+        result = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == '[]'
@@ -0,0 +1,35 @@
+from array import array
+from datetime import datetime
+from random import Random
+
+from benchmarks.report import summarize
+from benchmarks.seed import generate_books, generate_borrows
+from app.services.borrow_service import MAX_ACTIVE_BORROWS
+
+
+def _generate(seed):
+    books = list(generate_books(Random(seed), 50))
+    total_copies = array('i', [0] + [book['total_copies'] for book in books])
+    on_loan = array('i', [0]) * 51
+    open_loans = array('i', [0]) * 11
+    loans = list(generate_borrows(Random(seed), 2000, total_copies, on_loan, open_loans, datetime(2026, 1, 1), 0.5))
+    return books, loans, total_copies, on_loan, open_loans
+
+
+class TestBenchmarkDataset:
+    def test_generator_is_deterministic(self):
+        assert _generate(1)[:2] == _generate(1)[:2]
+        assert _generate(1)[1] != _generate(2)[1]
+
+    def test_open_loans_respect_copies_and_member_limit(self):
+        books, loans, total_copies, on_loan, open_loans = _generate(3)
+        open_records = [loan for loan in loans if loan['returned_at'] is None]
+        assert open_records
+        assert all(count <= MAX_ACTIVE_BORROWS for count in open_loans)
+        assert all(on_loan[i] <= total_copies[i] for i in range(1, len(books) + 1))
+        assert sum(open_loans) == sum(on_loan) == len(open_records)
+
+    def test_summarize_percentiles(self):
+        stats = summarize([i / 1000 for i in range(1, 101)], elapsed=2.0)
+        assert (stats['p50_ms'], stats['p95_ms'], stats['p99_ms']) == (50.0, 95.0, 99.0)
+        assert stats['ops_per_sec'] == 50.0
@@ -1,5 +1,12 @@
+import asyncio
+
 from fastapi import status
 
+from app.dependencies import get_current_user
+from app.main import app
+from app.pubsub import broker
+from app.services.availability_service import AsyncAvailabilityService, publish_availability
+
 class TestCreateBook:
     def test_create_book_success(self, client, sample_book_data):
         response = client.post('/books/', json=sample_book_data)
@@ -31,3 +38,225 @@ class TestListBooks:
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert len(data) == 2
+
+    def test_list_books_with_cursor(self, client):
+        for i in range(5):
+            book = {'title': f'Book {i}', 'author': 'Author', 'isbn': f'978-100000000{i}', 'total_copies': 1}
+            client.post('/books/', json=book)
+        first_page = client.get('/books/', params={'limit': 2})
+        assert first_page.status_code == status.HTTP_200_OK
+        cursor = first_page.headers['X-Next-Cursor']
+        second_page = client.get('/books/', params={'limit': 2, 'cursor': cursor})
+        assert [b['title'] for b in second_page.json()] == ['Book 2', 'Book 3']
+        last_page = client.get('/books/', params={'limit': 2, 'cursor': second_page.headers['X-Next-Cursor']})
+        assert len(last_page.json()) == 1
+        assert 'X-Next-Cursor' not in last_page.headers
+
+    def test_list_books_invalid_cursor(self, client):
+        response = client.get('/books/', params={'cursor': 'not-a-cursor'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_books_matches_single_book_response(self, client, sample_book_data):
+        book = client.post('/books/', json=sample_book_data).json()
+        assert client.get('/books/').json() == [client.get(f"/books/{book['id']}").json()]
+        schema = client.get('/openapi.json').json()['paths']['/books/']['get']['responses']['200']['content']['application/json']['schema']
+        assert schema['items']['$ref'] == '#/components/schemas/BookResponse'
+
+class TestTotalCount:
+    def test_total_count_is_opt_in(self, client, sample_book_data):
+        client.post('/books/', json=sample_book_data)
+        assert 'X-Total-Count' not in client.get('/books/').headers
+
+    def test_unfiltered_total_follows_creates_and_deletes(self, client):
+        ids = [
+            client.post('/books/', json={'title': f'Book {i}', 'author': 'Author', 'isbn': f'978-200000000{i}', 'total_copies': 1}).json()['id']
+            for i in range(3)
+        ]
+        client.delete(f'/books/{ids[0]}')
+        response = client.get('/books/', params={'include_total': True, 'limit': 1})
+        assert response.headers['X-Total-Count'] == '2'
+        assert response.headers['X-Total-Count-Exact'] == 'true'
+        members = client.get('/members/', params={'include_total': True})
+        assert members.headers['X-Total-Count'] == '0'
+
+    def test_large_filtered_total_is_estimated(self, client, monkeypatch):
+        monkeypatch.setattr('app.services.count_service.COUNT_EXACT_LIMIT', 2)
+        for i in range(4):
+            client.post('/books/', json={'title': f'Book {i}', 'author': 'Author', 'isbn': f'978-300000000{i}', 'total_copies': 1})
+        client.post('/books/', json={'title': 'Other', 'author': 'Someone', 'isbn': '978-3000000009', 'total_copies': 1})
+        response = client.get('/books/', params={'author': 'Author', 'include_total': True})
+        assert response.headers['X-Total-Count'] == '4'
+        assert response.headers['X-Total-Count-Exact'] == 'false'
+        small = client.get('/books/', params={'author': 'Someone', 'include_total': True})
+        assert (small.headers['X-Total-Count'], small.headers['X-Total-Count-Exact']) == ('1', 'true')
+
+
+class TestSearchBooks:
+    def test_search_by_title_and_author(self, client, sample_book_data):
+        client.post('/books/', json=sample_book_data)
+        second_book = {'title': 'Design Patterns', 'author': 'Gang of Four', 'isbn': '978-0201633612', 'total_copies': 3}
+        client.post('/books/', json=second_book)
+        response = client.get('/books/search', params={'q': 'clean'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [b['title'] for b in response.json()] == ['Clean Code']
+        response = client.get('/books/search', params={'q': 'gang fo'})
+        assert [b['title'] for b in response.json()] == ['Design Patterns']
+
+    def test_search_reflects_updates_and_deletes(self, client, sample_book_data):
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        client.patch(f'/books/{book_id}', json={'title': 'Refactoring'})
+        assert client.get('/books/search', params={'q': 'clean'}).json() == []
+        assert len(client.get('/books/search', params={'q': 'refactoring'}).json()) == 1
+        client.delete(f'/books/{book_id}')
+        assert client.get('/books/search', params={'q': 'refactoring'}).json() == []
+
+class TestImportBooks:
+    def test_import_csv_reports_row_errors(self, client, sample_book_data):
+        client.post('/books/', json=sample_book_data)
+        content = (
+            'title,author,isbn,total_copies\n'
+            'Refactoring,Martin Fowler,978-0201485677,2\n'
+            'Clean Code,Robert C. Martin,978-0132350884,1\n'
+            'Bad Row,Someone,978-0000000001,zero\n'
+            'Refactoring Again,Martin Fowler,978-0201485677,1\n'
+        )
+        response = client.post('/books/import', files={'file': ('books.csv', content, 'text/csv')})
+        assert response.status_code == status.HTTP_200_OK
+        report = response.json()
+        assert report['processed'] == 4
+        assert report['inserted'] == 1
+        assert [error['line'] for error in report['errors']] == [3, 4, 5]
+        assert 'already exists' in report['errors'][0]['error']
+        assert 'total_copies' in report['errors'][1]['error']
+
+        books = client.get('/books/', params={'title': 'Refactoring'}).json()
+        assert len(books) == 1
+        assert books[0]['available_copies'] == 2
+
+    def test_import_ndjson(self, client):
+        content = (
+            '{"title": "Design Patterns", "author": "Gang of Four", "isbn": "978-0201633612", "total_copies": 3}\n'
+            '\n'
+            'not json\n'
+        )
+        response = client.post('/books/import', files={'file': ('books.ndjson', content, 'application/x-ndjson')})
+        report = response.json()
+        assert report['inserted'] == 1
+        assert report['errors'] == [{'line': 3, 'error': 'Invalid JSON'}]
+
+    def test_import_rejects_unknown_format(self, client):
+        response = client.post('/books/import', files={'file': ('books.xml', '<books/>', 'application/xml')})
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+class TestBookCache:
+    def test_get_book_is_served_from_cache_and_invalidated_on_update(self, client, sample_book_data):
+        from app.services.book_service import book_cache
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        client.get(f'/books/{book_id}')
+        hits = book_cache.hits
+        assert client.get(f'/books/{book_id}').json()['title'] == sample_book_data['title']
+        assert book_cache.hits == hits + 1
+
+        client.patch(f'/books/{book_id}', json={'title': 'Clean Code 2nd Edition'})
+        assert client.get(f'/books/{book_id}').json()['title'] == 'Clean Code 2nd Edition'
+
+        client.delete(f'/books/{book_id}')
+        assert client.get(f'/books/{book_id}').status_code == status.HTTP_404_NOT_FOUND
+
+class TestConditionalGet:
+    def test_get_book_not_modified_until_borrowed(self, client, sample_book_data, sample_member_data):
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        etag = client.get(f'/books/{book_id}').headers['ETag']
+
+        response = client.get(f'/books/{book_id}', headers={'If-None-Match': etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+
+        client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id})
+        response = client.get(f'/books/{book_id}', headers={'If-None-Match': etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers['ETag'] != etag
+        assert response.json()['version'] == 2
+
+    def test_list_books_etag_changes_with_page_contents(self, client, sample_book_data):
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        etag = client.get('/books/').headers['ETag']
+        assert client.get('/books/', headers={'If-None-Match': etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+        client.patch(f'/books/{book_id}', json={'total_copies': 7})
+        assert client.get('/books/', headers={'If-None-Match': etag}).status_code == status.HTTP_200_OK
+
+    def test_conditional_get_missing_book(self, client):
+        response = client.get('/books/99999', headers={'If-None-Match': '"book-99999-v1"'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+class TestExportBooks:
+    def test_export_ndjson(self, client, sample_book_data):
+        client.post('/books/', json=sample_book_data)
+        response = client.get('/books/export')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers['content-type'].startswith('application/x-ndjson')
+        lines = response.text.splitlines()
+        assert len(lines) == 1
+        assert '"isbn": "978-0132350884"' in lines[0]
+
+    def test_export_csv_gzip(self, client, sample_book_data):
+        client.post('/books/', json=sample_book_data)
+        response = client.get('/books/export', params={'format': 'csv', 'gzip': True})
+        assert response.headers['content-encoding'] == 'gzip'
+        lines = response.text.splitlines()
+        assert lines[0] == 'id,title,author,isbn,total_copies,available_copies,created_at'
+        assert lines[1].startswith('1,Clean Code,Robert C. Martin,978-0132350884,5,5,')
+
+    def test_export_requires_authentication(self, client, sample_book_data):
+        client.post('/books/', json=sample_book_data)
+        app.dependency_overrides.pop(get_current_user)
+        response = client.get('/books/export')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestAvailabilityStream:
+    def test_stream_unknown_book(self, client):
+        assert client.get('/books/99999/availability/stream').status_code == status.HTTP_404_NOT_FOUND
+        assert client.get('/books/availability/stream').status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+    def test_stream_pushes_borrow_return_and_update(self, client, db_session, sample_book_data, sample_member_data):
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+
+        # TestClient buffers whole responses, so read the endless stream from the service directly
+        async def watch():
+            response = await AsyncAvailabilityService.stream(db_session, [book_id])
+            events = response.body_iterator
+            received = [await anext(events), await anext(events)]
+            borrow_id = (await asyncio.to_thread(
+                client.post, '/borrows/', json={'book_id': book_id, 'member_id': member_id}
+            )).json()['id']
+            received.append(await anext(events))
+            await asyncio.to_thread(client.post, f'/borrows/{borrow_id}/return', json={})
+            received.append(await anext(events))
+            await asyncio.to_thread(client.patch, f'/books/{book_id}', json={'total_copies': 8})
+            received.append(await anext(events))
+            await events.aclose()
+            return received
+
+        received = asyncio.run(watch())
+        assert received[0] == 'retry: 5000\n\n'
+        assert [event.splitlines()[1] for event in received[1:]] == [
+            f'data: {{"book_id": {book_id}, "available_copies": {copies}, "version": {version}}}'
+            for version, copies in enumerate((5, 4, 5, 8), start=1)
+        ]
+
+    def test_out_of_order_publishes_are_dropped(self):
+        async def watch():
+            subscription = broker.subscribe(['book:1:availability'])
+            subscription.skip_to('book:1:availability', 2)
+            for copies, version in ((4, 3), (3, 4), (4, 3), (9, 1)):
+                publish_availability(1, copies, version)
+            await asyncio.sleep(0)
+            received = await subscription.get(0.1)
+            subscription.close()
+            return received
+
+        assert asyncio.run(watch()) == [{'book_id': 1, 'available_copies': 3, 'version': 4}]
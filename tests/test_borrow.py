@@ -1,5 +1,16 @@
-from fastapi import status
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from fastapi import APIRouter, FastAPI, Response, status
+from fastapi.testclient import TestClient
 import pytest
+from sqlalchemy import select
+
+from app.idempotency import IdempotentRoute
+from app.models.stats import BookDailyStats
+from app.services.auth_service import ALGORITHM, SECRET_KEY, AuthService
+from app.services.overdue_service import OverdueService
 
 
 class TestBorrowBook:
@@ -139,6 +150,52 @@ class TestBorrowBook:
         assert 'borrow limit' in response.json()['detail'].lower()
 
 
+    def test_failed_borrow_does_not_consume_a_copy(self, client, sample_book_data, sample_member_data):
+        """Test that a rejected borrow leaves available_copies untouched"""
+        book_response = client.post('/books/', json=sample_book_data)
+        book_id = book_response.json()['id']
+        initial_available = book_response.json()['available_copies']
+
+        # Unknown member is rejected after the copy was reserved, so it must be released
+        response = client.post('/borrows/', json={'book_id': book_id, 'member_id': 99999})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        book_check = client.get(f'/books/{book_id}')
+        assert book_check.json()['available_copies'] == initial_available
+
+    def test_concurrent_borrows_never_exceed_available_copies(self, client):
+        """Test that simultaneous borrows of the same book succeed only as many times as there are copies"""
+        book = {'title': 'Popular', 'author': 'Author', 'isbn': '978-4000000000', 'total_copies': 2}
+        book_id = client.post('/books/', json=book).json()['id']
+        member_ids = [
+            client.post('/members/', json={'full_name': f'Member {i}', 'email': f'member{i}@example.com'}).json()['id']
+            for i in range(6)
+        ]
+        start = threading.Barrier(len(member_ids))
+
+        def borrow(member_id):
+            start.wait()
+            return client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id}).status_code
+
+        with ThreadPoolExecutor(max_workers=len(member_ids)) as pool:
+            codes = list(pool.map(borrow, member_ids))
+
+        assert sorted(codes) == [status.HTTP_200_OK] * 2 + [status.HTTP_409_CONFLICT] * 4
+        assert client.get(f'/books/{book_id}').json()['available_copies'] == 0
+
+    def test_active_borrow_count_tracks_borrows_and_returns(self, client, sample_book_data, sample_member_data):
+        """Test that the member's denormalized active_borrow_count follows borrow and return"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        assert client.get(f'/members/{member_id}').json()['active_borrow_count'] == 0
+
+        borrow_id = client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id}).json()['id']
+        client.post('/borrows/batch', json={'items': [{'book_id': book_id, 'member_id': member_id}]})
+        assert client.get(f'/members/{member_id}').json()['active_borrow_count'] == 2
+
+        client.post(f'/borrows/{borrow_id}/return', json={})
+        assert client.get(f'/members/{member_id}').json()['active_borrow_count'] == 1
+
 class TestReturnBook:
     def test_return_book_success(self, client, sample_book_data, sample_member_data):
         """Test successfully returning a borrowed book"""
@@ -228,6 +285,69 @@ class TestReturnBook:
         assert 'already been returned' in response.json()['detail'].lower()
 
 
+class TestBatchBorrow:
+    def test_batch_borrow_reports_per_item_results(self, client, sample_member_data):
+        """Test that a batch checkout applies availability and limit checks per item"""
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        books = []
+        for i in range(3):
+            book_data = {
+                'title': f'Book {i+1}',
+                'author': f'Author {i+1}',
+                'isbn': f'978-000000000{i}',
+                'total_copies': 1
+            }
+            books.append(client.post('/books/', json=book_data).json()['id'])
+
+        items = [
+            {'book_id': books[0], 'member_id': member_id},
+            {'book_id': books[0], 'member_id': member_id},  # only one copy
+            {'book_id': books[1], 'member_id': 99999},
+            {'book_id': books[1], 'member_id': member_id},
+            {'book_id': 99999, 'member_id': member_id},
+        ]
+        response = client.post('/borrows/batch', json={'items': items})
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.json()
+        assert [r['status_code'] for r in results] == [200, 409, 404, 200, 409]
+        assert results[0]['record']['book_id'] == books[0]
+        assert results[3]['record']['returned_at'] is None
+        assert client.get(f'/books/{books[0]}').json()['available_copies'] == 0
+        assert client.get(f'/books/{books[1]}').json()['available_copies'] == 0
+        assert len(client.get(f'/borrows/members/{member_id}/borrows').json()) == 2
+
+    def test_batch_borrow_enforces_limit(self, client, sample_member_data):
+        """Test that the 3-book limit counts items earlier in the same batch"""
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        book_data = {'title': 'Popular', 'author': 'Author', 'isbn': '978-1111111111', 'total_copies': 5}
+        book_id = client.post('/books/', json=book_data).json()['id']
+
+        items = [{'book_id': book_id, 'member_id': member_id}] * 4
+        results = client.post('/borrows/batch', json={'items': items}).json()
+
+        assert [r['status_code'] for r in results] == [200, 200, 200, 400]
+        assert client.get(f'/books/{book_id}').json()['available_copies'] == 2
+
+    def test_batch_return(self, client, sample_book_data, sample_member_data):
+        """Test returning several borrows at once"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        borrow_ids = [
+            client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id}).json()['id']
+            for _ in range(2)
+        ]
+        client.post(f'/borrows/{borrow_ids[1]}/return', json={})
+
+        response = client.post('/borrows/return/batch', json={'borrow_ids': [borrow_ids[0], borrow_ids[1], 99999]})
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.json()
+        assert [r['status_code'] for r in results] == [200, 409, 404]
+        assert results[0]['record']['returned_at'] is not None
+        assert client.get(f'/books/{book_id}').json()['available_copies'] == sample_book_data['total_copies']
+
+
 class TestMemberBorrowHistory:
     def test_get_member_borrow_history(self, client, sample_book_data, sample_member_data):
         """Test retrieving borrow history for a member"""
@@ -268,3 +388,212 @@ class TestMemberBorrowHistory:
         data = response.json()
         assert isinstance(data, list)
         assert len(data) == 0
+
+    def test_borrow_history_etag_changes_on_return(self, client, sample_book_data, sample_member_data):
+        """Test conditional GET on borrow history"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        borrow_id = client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id}).json()['id']
+
+        etag = client.get(f'/borrows/members/{member_id}/borrows').headers['ETag']
+        response = client.get(f'/borrows/members/{member_id}/borrows', headers={'If-None-Match': etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        client.post(f'/borrows/{borrow_id}/return', json={})
+        response = client.get(f'/borrows/members/{member_id}/borrows', headers={'If-None-Match': etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()[0]['returned_at'] is not None
+
+
+    def test_member_history_pagination_and_filters(self, client, sample_book_data, sample_member_data):
+        """Test paging member history with a cursor and filtering active loans"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        borrow_ids = [
+            client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id}).json()['id']
+            for _ in range(3)
+        ]
+        client.post(f'/borrows/{borrow_ids[0]}/return', json={})
+
+        url = f'/borrows/members/{member_id}/borrows'
+        first = client.get(url, params={'limit': 2, 'order': 'desc'})
+        assert [r['id'] for r in first.json()] == [borrow_ids[2], borrow_ids[1]]
+        second = client.get(url, params={'limit': 2, 'order': 'desc', 'cursor': first.headers['X-Next-Cursor']})
+        assert [r['id'] for r in second.json()] == [borrow_ids[0]]
+        assert 'X-Next-Cursor' not in second.headers
+
+        active = client.get(url, params={'active_only': True}).json()
+        assert [r['id'] for r in active] == borrow_ids[1:]
+
+class TestExportBorrows:
+    def test_export_filters_by_borrowed_at(self, client, sample_book_data, sample_member_data):
+        """Test streaming the borrow ledger with a date range"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id})
+
+        response = client.get('/borrows/export', params={'borrowed_from': '2000-01-01T00:00:00'})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.text.splitlines()) == 1
+
+        response = client.get('/borrows/export', params={'borrowed_to': '2000-01-01T00:00:00', 'format': 'csv'})
+        assert response.text.splitlines() == ['id,book_id,member_id,borrowed_at,due_date,returned_at']
+
+class TestOverdueBorrows:
+    def test_overdue_report_pages_open_loans(self, client, sample_book_data, sample_member_data):
+        """Test that only unreturned loans past due are listed, in due_date order with a cursor"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        borrow_ids = [
+            client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id}).json()['id']
+            for _ in range(3)
+        ]
+        client.post(f'/borrows/{borrow_ids[1]}/return', json={})
+
+        assert client.get('/borrows/overdue').json() == []
+
+        future = {'as_of': '2100-01-01T00:00:00', 'limit': 1}
+        first = client.get('/borrows/overdue', params=future)
+        assert [r['id'] for r in first.json()] == [borrow_ids[0]]
+        second = client.get('/borrows/overdue', params={**future, 'cursor': first.headers['X-Next-Cursor']})
+        assert [r['id'] for r in second.json()] == [borrow_ids[2]]
+
+    def test_overdue_summary_refresh(self, client, sample_book_data, sample_member_data):
+        """Test that the sweep rebuilds per-member and per-book overdue counts"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        client.post('/borrows/batch', json={'items': [{'book_id': book_id, 'member_id': member_id}] * 2})
+
+        result = client.post('/borrows/overdue/summary/refresh', params={'as_of': '2100-01-01T00:00:00'}).json()
+        assert (result['overdue_loans'], result['members'], result['books']) == (2, 1, 1)
+
+        summary = client.get('/borrows/overdue/summary', params={'scope': 'book'}).json()
+        assert [(s['entity_id'], s['overdue_count']) for s in summary] == [(book_id, 2)]
+
+        client.post('/borrows/overdue/summary/refresh')
+        assert client.get('/borrows/overdue/summary').json() == []
+
+    def test_background_sweep_skips_a_fresh_summary(self, client, db_session, sample_book_data, sample_member_data, monkeypatch):
+        """Test that a worker's sweep is skipped only while another worker's rebuild is recent by the wall clock"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id})
+        result = client.post('/borrows/overdue/summary/refresh', params={'as_of': '2100-01-01T00:00:00'}).json()
+        assert result['refreshed_at'] < '2100'
+
+        assert OverdueService.refresh_summary(db_session, skip_if_running=True) is None
+        # Once half an interval has passed the sweep runs, however far ahead the manual as_of was
+        monkeypatch.setattr('app.services.overdue_service.OVERDUE_SWEEP_INTERVAL', 0)
+        assert OverdueService.refresh_summary(db_session, skip_if_running=True)['overdue_loans'] == 0
+
+class TestCirculationStats:
+    def test_stats_follow_borrows_and_returns(self, client, sample_book_data, sample_member_data):
+        """Test that the daily aggregates are updated by borrow, batch borrow and return"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        borrow_id = client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id}).json()['id']
+        client.post('/borrows/batch', json={'items': [{'book_id': book_id, 'member_id': member_id}] * 2})
+        client.post(f'/borrows/{borrow_id}/return', json={})
+
+        top_books = client.get('/stats/books/top').json()
+        assert [(s['book_id'], s['borrows']) for s in top_books] == [(book_id, 3)]
+        top_members = client.get('/stats/members/top').json()
+        assert [(s['member_id'], s['full_name'], s['borrows']) for s in top_members] == [(member_id, 'John Doe', 3)]
+        daily = client.get('/stats/borrows/daily').json()
+        assert [(d['borrows'], d['returns']) for d in daily] == [(3, 1)]
+        utilization = client.get('/stats/books/utilization').json()
+        assert utilization == [{'book_id': book_id, 'title': 'Clean Code', 'total_copies': 5, 'on_loan': 2, 'utilization': 0.4}]
+
+    def test_rebuild_matches_incremental_aggregates(self, client, sample_book_data, sample_member_data):
+        """Test that rebuilding from borrow_records reproduces the incrementally maintained counts"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        borrow_ids = [
+            client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id}).json()['id']
+            for _ in range(2)
+        ]
+        client.post('/borrows/return/batch', json={'borrow_ids': borrow_ids})
+        before = client.get('/stats/borrows/daily').json()
+
+        assert client.post('/stats/rebuild').json() == {'book_daily_stats': 1, 'member_daily_stats': 1}
+        assert client.get('/stats/borrows/daily').json() == before == [{'day': before[0]['day'], 'borrows': 2, 'returns': 2}]
+
+    def test_returns_are_bucketed_by_utc_day(self, client, db_session, sample_book_data, sample_member_data):
+        """Test that a return sent with a UTC offset counts on its UTC day, both incrementally and after a rebuild"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        borrow_id = client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id}).json()['id']
+        client.post('/borrows/return/batch', json={'borrow_ids': [borrow_id], 'return_date': '2030-01-01T23:30:00-05:00'})
+
+        returns = lambda: db_session.execute(select(BookDailyStats.day).where(BookDailyStats.returns > 0)).scalars().all()
+        assert returns() == [date(2030, 1, 2)]
+        client.post('/stats/rebuild')
+        assert returns() == [date(2030, 1, 2)]
+
+class TestIdempotencyKeys:
+    def test_retried_borrow_is_replayed_not_repeated(self, client, sample_book_data, sample_member_data):
+        """Test that a retry with the same Idempotency-Key returns the first loan without borrowing again"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        headers = {'Idempotency-Key': 'kiosk-7-0001'}
+        payload = {'book_id': book_id, 'member_id': member_id}
+
+        first = client.post('/borrows/', json=payload, headers=headers)
+        retry = client.post('/borrows/', json=payload, headers=headers)
+        assert retry.status_code == first.status_code == status.HTTP_200_OK
+        assert retry.json() == first.json()
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert 'Idempotent-Replayed' not in first.headers
+        assert client.get(f'/books/{book_id}').json()['available_copies'] == sample_book_data['total_copies'] - 1
+        assert len(client.get(f'/borrows/members/{member_id}/borrows').json()) == 1
+
+    def test_idempotency_key_reused_for_different_request(self, client, sample_book_data):
+        """Test that a key cannot be replayed for a different payload, and errors are replayed too"""
+        headers = {'Idempotency-Key': 'create-book'}
+        book_id = client.post('/books/', json=sample_book_data, headers=headers).json()['id']
+
+        other_book = {**sample_book_data, 'isbn': '978-0000000000'}
+        response = client.post('/books/', json=other_book, headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+        missing = {'book_id': book_id, 'member_id': 99999}
+        first = client.post('/borrows/', json=missing, headers={'Idempotency-Key': 'missing'})
+        retry = client.post('/borrows/', json=missing, headers={'Idempotency-Key': 'missing'})
+        assert retry.status_code == first.status_code == status.HTTP_404_NOT_FOUND
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+
+    def test_key_is_scoped_to_the_user_not_the_token(self, client, sample_book_data):
+        """Test that a retry with a fresh token for the same user is replayed, while another user's same key is not"""
+        def bearer(username, minutes):
+            token = AuthService.create_access_token({'sub': username}, SECRET_KEY, ALGORITHM, timedelta(minutes=minutes))
+            return {'Authorization': f'Bearer {token}', 'Idempotency-Key': 'create-book'}
+
+        first = client.post('/books/', json=sample_book_data, headers=bearer('librarian', 15))
+        # Logging in again issues a different token for the same user
+        retry = client.post('/books/', json=sample_book_data, headers=bearer('librarian', 30))
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert retry.json() == first.json()
+
+        other_book = {**sample_book_data, 'isbn': '978-0201633612'}
+        other = client.post('/books/', json=other_book, headers=bearer('assistant', 15))
+        assert 'Idempotent-Replayed' not in other.headers
+        assert other.json()['id'] != first.json()['id']
+
+    def test_replay_keeps_response_headers(self):
+        """Test that headers set by the handler, such as ETag, come back on a replay"""
+        router = APIRouter(route_class=IdempotentRoute)
+
+        @router.post('/tagged')
+        async def tagged(response: Response):
+            response.headers['ETag'] = '"tagged-v1"'
+            return {'ok': True}
+
+        api = FastAPI()
+        api.include_router(router)
+        tagged_client = TestClient(api)
+        headers = {'Idempotency-Key': 'tagged'}
+        first = tagged_client.post('/tagged', headers=headers)
+        retry = tagged_client.post('/tagged', headers=headers)
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert retry.headers['ETag'] == first.headers['ETag'] == '"tagged-v1"'
+        assert retry.headers['content-type'] == first.headers['content-type']
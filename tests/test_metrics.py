@@ -0,0 +1,25 @@
+from app.metrics import registry
+
+
+class TestMetrics:
+    def test_server_timing_counts_queries(self, client, sample_book_data):
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        response = client.get(f'/books/{book_id}')
+        server_timing = response.headers['Server-Timing']
+        assert server_timing.startswith('db;dur=')
+        assert 'desc="1 queries"' in server_timing
+
+    def test_metrics_endpoint_labels_by_route_template(self, client, sample_book_data):
+        registry.clear()
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        client.get(f'/books/{book_id}')
+        client.get('/books/999999')
+
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+        body = response.text
+        assert 'http_requests_total{method="GET",route="/books/{book_id}",status="200"} 1' in body
+        assert 'http_requests_total{method="GET",route="/books/{book_id}",status="404"} 1' in body
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/books/{book_id}",le="+Inf"} 2' in body
+        assert 'db_queries_total{method="POST",route="/books/"}' in body
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app import database
+from app.pool import POOL_MONITORS, pool_stats
+
+
+class TestConnectionPool:
+    def test_pool_records_checkouts_and_timeouts(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(database, 'DB_POOL_SIZE', 1)
+        monkeypatch.setattr(database, 'DB_MAX_OVERFLOW', 0)
+        monkeypatch.setattr(database, 'DB_POOL_TIMEOUT', 0.05)
+        monkeypatch.setitem(POOL_MONITORS, 'test', None)
+        engine = database.create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", 'test')
+
+        with engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+            stats = pool_stats()['test']
+            assert stats['checked_out'] == 1
+            assert stats['timeouts'] == 1
+
+        engine.dispose()
+        with engine.connect():
+            pass
+        stats = pool_stats()['test']
+        assert stats['checkouts'] == 2
+        assert stats['wait_seconds_histogram']['+Inf'] == 2
+
+    def test_admin_pool_endpoint(self, client):
+        response = client.get('/admin/pool')
+        assert response.status_code == 200
+        assert 'checked_out' in response.json()['primary']
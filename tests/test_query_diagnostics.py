@@ -0,0 +1,38 @@
+import logging
+
+import pytest
+
+from app import query_diagnostics
+from app.query_diagnostics import normalize_statement, track_queries
+
+
+class TestQueryDiagnostics:
+    def test_normalize_statement_strips_values(self):
+        statement = "SELECT * FROM books\n WHERE id = 42 AND title = 'It''s' AND isbn IN (?, ?, ?) AND x = :x_1"
+        assert normalize_statement(statement) == 'SELECT * FROM books WHERE id = ? AND title = ? AND isbn IN (?, ...) AND x = ?'
+
+    def test_repeated_statement_shapes_are_flagged(self, client, sample_book_data):
+        book_ids = [
+            client.post('/books/', json={**sample_book_data, 'isbn': f'978-000000000{i}'}).json()['id']
+            for i in range(5)
+        ]
+        with track_queries() as tracker:
+            for book_id in book_ids:
+                client.get(f'/books/{book_id}')
+        assert [count for _, count in tracker.repeated(5)] == [5]
+
+    @pytest.mark.query_budget(14)
+    def test_borrow_stays_within_query_budget(self, client, sample_book_data, sample_member_data):
+        """Test that a borrow (three statements plus two stats upserts) stays fixed on top of the nine setup statements (each create also seeds its row counter)"""
+        book_id = client.post('/books/', json=sample_book_data).json()['id']
+        member_id = client.post('/members/', json=sample_member_data).json()['id']
+        response = client.post('/borrows/', json={'book_id': book_id, 'member_id': member_id})
+        assert response.status_code == 200
+
+    def test_slow_queries_are_logged_with_plan(self, client, sample_book_data, monkeypatch, caplog):
+        monkeypatch.setattr(query_diagnostics, 'QUERY_DIAGNOSTICS', True)
+        monkeypatch.setattr(query_diagnostics, 'SLOW_QUERY_MS', 0)
+        with caplog.at_level(logging.WARNING, logger='app.query_diagnostics'):
+            client.get('/books/')
+        slow = [record.getMessage() for record in caplog.records if record.getMessage().startswith('Slow query')]
+        assert slow and 'FROM books' in slow[0]
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.book import Book
+from app.pool import POOL_MONITORS
+from app.replicas import replica_set
+
+
+@pytest.fixture
+def replica_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(Book(title='Replica Only', author='Nobody', isbn='000-0000000000', total_copies=1, available_copies=1))
+        db.commit()
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def use_replicas(monkeypatch):
+    def configure(*urls):
+        for index in range(len(urls)):
+            monkeypatch.setitem(POOL_MONITORS, f'replica_{index}', None)
+        replica_set.configure(list(urls))
+    yield configure
+    replica_set.configure([])
+
+
+class TestReadReplicas:
+    def test_reads_use_replica_until_client_writes(self, client, sample_book_data, replica_url, use_replicas):
+        use_replicas(replica_url)
+        assert [book['title'] for book in client.get('/books/').json()] == ['Replica Only']
+
+        created = client.post('/books/', json=sample_book_data).json()
+        # The write pins this client to the primary, so it sees its own book immediately
+        assert [book['id'] for book in client.get('/books/').json()] == [created['id']]
+        assert client.get(f"/books/{created['id']}").status_code == 200
+
+    def test_unreachable_replica_falls_back_to_primary(self, client, sample_book_data, tmp_path, use_replicas):
+        client.post('/books/', json=sample_book_data)
+        use_replicas(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+
+        response = client.get('/books/')
+        assert response.status_code == 200
+        assert [book['title'] for book in response.json()] == [sample_book_data['title']]
+        stats = client.get('/admin/replicas').json()['replica_0']
+        assert stats['healthy'] is False
+        assert stats['failures'] == 1